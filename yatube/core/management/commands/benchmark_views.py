@@ -0,0 +1,189 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+
+import django
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from about import urls as about_urls
+from posts import urls as posts_urls
+from posts.models import Group, Post, Tag, User
+from users import urls as users_urls
+
+URL_MODULES = (posts_urls, users_urls, about_urls)
+# Адреса, которые меняют состояние или сессию клиента.
+SKIP = {'posts:profile_follow', 'posts:profile_unfollow', 'users:logout'}
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(share * len(ordered)) - 1))
+    return ordered[index]
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет p50/p95 времени ответа и число SQL-запросов для всех '
+        'адресов posts, users и about и выводит результат в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='очищать кэш перед каждым запросом',
+        )
+        parser.add_argument('--output', help='файл для JSON (иначе stdout)')
+        parser.add_argument(
+            '--compare',
+            help='JSON прошлого прогона: вывести изменение p50/p95',
+        )
+        parser.add_argument(
+            '--user', help='username для авторизованных замеров'
+        )
+
+    def sample_kwargs(self, user):
+        post = Post.objects.filter(author=user).first() or Post.objects.first()
+        group = Group.objects.order_by('-posts_count').first()
+        if post is None or group is None:
+            raise CommandError(
+                'Нет данных; сначала выполните seed_benchmark_data.'
+            )
+        tag = Tag.objects.annotate(
+            posts_count=Count('post_tags')
+        ).order_by('-posts_count').first()
+        return {
+            'slug': group.slug,
+            'username': user.username,
+            'post_id': post.pk,
+            'name': tag.name if tag else None,
+        }
+
+    def targets(self, kwargs):
+        for module in URL_MODULES:
+            for pattern in module.urlpatterns:
+                name = f'{module.app_name}:{pattern.name}'
+                converters = pattern.pattern.converters
+                # Без тегов в базе ленте тега нечего показать.
+                if name in SKIP or any(
+                    kwargs[key] is None for key in converters
+                ):
+                    continue
+                url = reverse(
+                    name, kwargs={key: kwargs[key] for key in converters}
+                )
+                yield name, url
+
+    def measure(self, client, url, options):
+        for _ in range(options['warmup']):
+            client.get(url)
+        timings = []
+        queries = []
+        status = None
+        for _ in range(options['iterations']):
+            if options['cold']:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url)
+                if response.streaming:
+                    for _ in response.streaming_content:
+                        pass
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+            status = response.status_code
+        return {
+            'status': status,
+            'p50_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'queries': max(queries),
+        }
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations должен быть положительным')
+        user = (
+            User.objects.filter(username=options['user']).first()
+            if options['user']
+            else User.objects.order_by('-post_counter__posts_count').first()
+        )
+        if user is None:
+            raise CommandError('Не найден пользователь для замеров.')
+        kwargs = self.sample_kwargs(user)
+
+        clients = {'anonymous': Client(SERVER_NAME='localhost')}
+        clients['authenticated'] = Client(SERVER_NAME='localhost')
+        clients['authenticated'].force_login(user)
+
+        results = []
+        for name, url in self.targets(kwargs):
+            for client_name, client in clients.items():
+                results.append({
+                    'name': name,
+                    'url': url,
+                    'client': client_name,
+                    **self.measure(client, url, options),
+                })
+                self.stderr.write(
+                    f'{name} [{client_name}]: '
+                    f'p50 {results[-1]["p50_ms"]} мс, '
+                    f'{results[-1]["queries"]} запросов'
+                )
+
+        report = {
+            'meta': {
+                'revision': git_revision(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'posts': Post.objects.count(),
+                'iterations': options['iterations'],
+                'cold': options['cold'],
+            },
+            'results': results,
+        }
+        if options['compare']:
+            self.compare(report, options['compare'])
+
+        data = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(data + '\n')
+        else:
+            self.stdout.write(data)
+
+    def compare(self, report, path):
+        with open(path, encoding='utf-8') as source:
+            baseline = {
+                (row['name'], row['client']): row
+                for row in json.load(source)['results']
+            }
+        for row in report['results']:
+            before = baseline.get((row['name'], row['client']))
+            if before is None:
+                continue
+            row['compare'] = {
+                key: round(row[key] / before[key], 3) if before[key] else None
+                for key in ('p50_ms', 'p95_ms')
+            }
+            row['compare']['queries'] = row['queries'] - before['queries']
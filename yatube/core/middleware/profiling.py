@@ -0,0 +1,173 @@
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+
+from .sql import QueryRecorder, view_name
+
+PROFILE_PARAM = 'profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_OUTPUT_HEADER = 'X-Profile'
+# Значение параметра выбирает способ: cProfile или семплирование стеков.
+MODES = {'1': 'pstats', 'pstats': 'pstats', 'collapsed': 'collapsed'}
+
+TEMPLATE_CODE = Template.render.__code__
+
+
+def frame_label(code):
+    return f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})'
+
+
+class StackSampler(threading.Thread):
+    """Раз в interval секунд снимает стек потока запроса.
+
+    Стеки копятся в формате collapsed stacks для flamegraph.pl
+    и speedscope: «кадр;кадр;кадр число».
+    """
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            codes = []
+            while frame is not None:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            if codes:
+                self.stacks[tuple(reversed(codes))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def template_share(self):
+        """Доля снимков, сделанных во время рендера шаблона."""
+        total = sum(self.stacks.values())
+        inside = sum(
+            count for stack, count in self.stacks.items()
+            if TEMPLATE_CODE in stack
+        )
+        return inside / total if total else 0
+
+    def write(self, path):
+        with open(path, 'w') as output:
+            for stack, count in self.stacks.most_common():
+                labels = ';'.join(
+                    frame_label(code).replace(';', ':') for code in stack
+                )
+                output.write(f'{labels} {count}\n')
+
+
+def template_time(profiler):
+    """Время рендера шаблонов по данным cProfile."""
+    stats = pstats.Stats(profiler).stats
+    key = (
+        TEMPLATE_CODE.co_filename,
+        TEMPLATE_CODE.co_firstlineno,
+        TEMPLATE_CODE.co_name,
+    )
+    if key not in stats:
+        return 0
+    return stats[key][3]
+
+
+class ProfilingMiddleware:
+    """Профилирование отдельного запроса по требованию.
+
+    Включается заданным PROFILING_DIR и срабатывает только для staff
+    по параметру ?profile= или заголовку X-Profile: 1 или pstats —
+    cProfile с файлом .prof, collapsed — семплирование стеков раз
+    в PROFILING_SAMPLE_INTERVAL секунд в файл .collapsed. Рядом пишется
+    .json с разбивкой времени на базу, шаблоны и остальной код view
+    (запросы из шаблонов входят в оба первых слагаемых), а имя файлов
+    возвращается в заголовке X-Profile. Без PROFILING_DIR
+    middleware не подключается, остальные запросы только проверяют
+    наличие параметра и заголовка.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_DIR:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        value = request.GET.get(PROFILE_PARAM) or request.META.get(
+            PROFILE_HEADER
+        )
+        mode = value and MODES.get(value)
+        if mode is None or not request.user.is_staff:
+            return self.get_response(request)
+        return self.profile(request, mode)
+
+    def profile(self, request, mode):
+        recorders = [
+            QueryRecorder(alias, settings.SQL_TOP_QUERIES)
+            for alias in connections
+        ]
+        if mode == 'pstats':
+            profiler = cProfile.Profile()
+        else:
+            profiler = StackSampler(
+                threading.get_ident(), settings.PROFILING_SAMPLE_INTERVAL
+            )
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for recorder in recorders:
+                stack.enter_context(
+                    connections[recorder.alias].execute_wrapper(recorder)
+                )
+            if mode == 'pstats':
+                response = profiler.runcall(self.get_response, request)
+            else:
+                profiler.start()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profiler.stop()
+        elapsed = time.perf_counter() - started
+
+        view = view_name(request.resolver_match) or 'unknown'
+        name = '-'.join((
+            time.strftime('%Y%m%d-%H%M%S'),
+            view.replace(':', '.'),
+            uuid.uuid4().hex[:8],
+        ))
+        base = os.path.join(settings.PROFILING_DIR, name)
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        if mode == 'pstats':
+            profiler.dump_stats(f'{base}.prof')
+            template = template_time(profiler)
+        else:
+            profiler.write(f'{base}.collapsed')
+            template = profiler.template_share() * elapsed
+        db = sum(recorder.total for recorder in recorders)
+        with open(f'{base}.json', 'w') as output:
+            json.dump({
+                'path': request.get_full_path(),
+                'view': view,
+                'mode': mode,
+                'queries': sum(recorder.count for recorder in recorders),
+                'total_ms': round(elapsed * 1000, 2),
+                'db_ms': round(db * 1000, 2),
+                'template_ms': round(template * 1000, 2),
+                'view_ms': round(max(elapsed - db - template, 0) * 1000, 2),
+            }, output, ensure_ascii=False, indent=2)
+        response[PROFILE_OUTPUT_HEADER] = name
+        return response
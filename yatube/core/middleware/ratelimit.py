@@ -0,0 +1,119 @@
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.http import HttpResponse
+
+from .sql import view_name
+
+RETRY_AFTER_HEADER = 'Retry-After'
+
+
+def client_ip(request):
+    """Адрес клиента с учётом RATELIMIT_PROXY_COUNT доверенных прокси.
+
+    За прокси REMOTE_ADDR — адрес самого прокси, и все клиенты попали бы
+    в один счётчик. Каждый доверенный прокси дописывает адрес в конец
+    X-Forwarded-For, поэтому клиент — N-й адрес с конца; всё левее
+    клиент мог подделать.
+    """
+    count = settings.RATELIMIT_PROXY_COUNT
+    if count:
+        forwarded = [
+            address.strip() for address in
+            request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')
+            if address.strip()
+        ]
+        if len(forwarded) >= count:
+            return forwarded[-count]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def client_key(request, scope):
+    """Кого ограничивает правило: пользователя или IP-адрес."""
+    if scope == 'user' and request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'ip:{client_ip(request)}'
+
+
+def count_hit(key, limit, period):
+    """Учитывает запрос в счётчике фиксированного окна длиной period.
+
+    Окна идут подряд от эпохи, у каждого свой ключ, который живёт до
+    конца окна: add создаёт его со сроком жизни, incr увеличивает
+    атомарно и срок не меняет. Возвращает None, если в окне было
+    не больше limit запросов, иначе секунды до следующего окна.
+    """
+    cache = caches[settings.RATELIMIT_CACHE]
+    now = time.time()
+    window = int(now // period)
+    remaining = max(math.ceil((window + 1) * period - now), 1)
+    counter = f'ratelimit:{key}:{period}:{window}'
+    if cache.add(counter, 1, remaining):
+        used = 1
+    else:
+        try:
+            used = cache.incr(counter)
+        except ValueError:
+            # Ключ истёк между add и incr: началось новое окно.
+            return count_hit(key, limit, period)
+    if used <= limit:
+        return None
+    return remaining
+
+
+class RateLimitMiddleware:
+    """Ограничивает частоту запросов к view из RATE_LIMITS.
+
+    RATE_LIMITS — словарь {имя url: [(scope, limit, period), ...]},
+    где scope — 'user' (для анонимов — IP) или 'ip'. Ограничиваются
+    только небезопасные методы; сверх лимита отдаётся 429 с заголовком
+    Retry-After, а в пределах лимита запрос стоит по add или incr в кэш
+    на правило. Счётчики живут в отдельном кэше RATELIMIT_CACHE, чтобы
+    их не вытесняли страницы и объекты из default.
+    """
+
+    def __init__(self, get_response):
+        if not settings.RATE_LIMITS:
+            raise MiddlewareNotUsed
+        if isinstance(
+            caches[settings.RATELIMIT_CACHE], (FileBasedCache, DatabaseCache)
+        ):
+            # Их incr — это get и set: он не атомарен и заменяет срок
+            # жизни ключа на TIMEOUT кэша, так что окна обрываются раньше.
+            raise ImproperlyConfigured(
+                'RATELIMIT_CACHE: нужен кэш с атомарным incr, '
+                'например memcached'
+            )
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method in ('GET', 'HEAD', 'OPTIONS'):
+            return None
+        name = view_name(request.resolver_match)
+        rules = settings.RATE_LIMITS.get(name)
+        if not rules:
+            return None
+        retry_after = None
+        for scope, limit, period in rules:
+            wait = count_hit(
+                f'{name}:{scope}:{client_key(request, scope)}', limit, period
+            )
+            if wait is not None:
+                retry_after = max(wait, retry_after or 0)
+        if retry_after is None:
+            return None
+        response = HttpResponse(
+            'Слишком много запросов, попробуйте позже.',
+            content_type='text/plain; charset=utf-8',
+            status=429,
+        )
+        response[RETRY_AFTER_HEADER] = str(retry_after)
+        return response
@@ -0,0 +1,143 @@
+import heapq
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('yatube.sql')
+
+SERVER_TIMING_HEADER = 'Server-Timing'
+
+
+class QueryRecorder:
+    """Считает запросы и их время, хранит только самые медленные."""
+
+    def __init__(self, alias, keep):
+        self.alias = alias
+        self.keep = keep
+        self.count = 0
+        self.total = 0.0
+        self.slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.total += duration
+            # Счётчик разводит равные длительности: строки не сравниваются.
+            item = (duration, self.count, sql, params, many)
+            if len(self.slowest) < self.keep:
+                heapq.heappush(self.slowest, item)
+            elif duration > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, item)
+
+
+def explain(alias, sql, params):
+    """План запроса; None, если его нельзя или не стоит получать."""
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    connection = connections[alias]
+    prefix = (
+        'EXPLAIN QUERY PLAN' if connection.vendor == 'sqlite' else 'EXPLAIN'
+    )
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            return [' '.join(map(str, row)) for row in cursor.fetchall()]
+    except Exception:
+        logger.exception('Не удалось получить план запроса')
+        return None
+
+
+def view_name(match):
+    """Имя view по app_name, а не по namespace подключения urls."""
+    if match is None:
+        return None
+    if match.url_name is None:
+        return match._func_path
+    return ':'.join([*match.app_names, match.url_name])
+
+
+class SQLInstrumentationMiddleware:
+    """Число запросов, время в БД и самые медленные запросы каждой view.
+
+    Итог уходит в заголовок Server-Timing и JSON-строкой в лог
+    yatube.sql; для запросов дольше SQL_SLOW_QUERY_MS дополнительно
+    пишется план. Обёртка execute_wrapper хранит лишь SQL_TOP_QUERIES
+    запросов, поэтому накладные расходы — пара вызовов perf_counter
+    на запрос, а EXPLAIN выполняется не чаще SQL_MAX_EXPLAINS раз.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SQL_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorders = [
+            QueryRecorder(alias, settings.SQL_TOP_QUERIES)
+            for alias in connections
+        ]
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for recorder in recorders:
+                stack.enter_context(
+                    connections[recorder.alias].execute_wrapper(recorder)
+                )
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        count = sum(recorder.count for recorder in recorders)
+        db_time = sum(recorder.total for recorder in recorders)
+        response[SERVER_TIMING_HEADER] = ', '.join((
+            f'db;dur={db_time * 1000:.2f};desc="{count} queries"',
+            f'app;dur={elapsed * 1000:.2f}',
+        ))
+        self.log(request, response, recorders, count, db_time, elapsed)
+        return response
+
+    def log(self, request, response, recorders, count, db_time, elapsed):
+        slowest = sorted(
+            (
+                (duration, recorder.alias, sql, params)
+                for recorder in recorders
+                for duration, _, sql, params, many in recorder.slowest
+            ),
+            key=lambda item: item[0],
+            reverse=True,
+        )[:settings.SQL_TOP_QUERIES]
+        view = view_name(request.resolver_match)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                'view': view,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'queries': count,
+                'db_ms': round(db_time * 1000, 2),
+                'total_ms': round(elapsed * 1000, 2),
+                'slowest': [
+                    {'ms': round(duration * 1000, 2), 'sql': sql}
+                    for duration, _, sql, _ in slowest
+                ],
+            }, ensure_ascii=False))
+
+        threshold = settings.SQL_SLOW_QUERY_MS / 1000
+        for duration, alias, sql, params in slowest[
+                :settings.SQL_MAX_EXPLAINS]:
+            if duration < threshold:
+                break
+            logger.warning(json.dumps({
+                'view': view,
+                'path': request.path,
+                'ms': round(duration * 1000, 2),
+                'sql': sql,
+                'plan': explain(alias, sql, params),
+            }, ensure_ascii=False))
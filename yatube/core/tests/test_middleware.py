@@ -0,0 +1,222 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.middleware.profiling import StackSampler
+from core.middleware.ratelimit import RateLimitMiddleware
+from posts.models import Post, User
+
+
+class SQLInstrumentationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.create(author=cls.user, text='Текст поста')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing_and_log(self):
+        """Ответ несёт Server-Timing, в лог пишется итог по view."""
+        with self.assertLogs('yatube.sql', 'INFO') as logs:
+            response = self.client.get(reverse('posts:index'))
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db;dur=[\d.]+;desc="\d+ queries", app;dur=[\d.]+$',
+        )
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+        self.assertLessEqual(len(record['slowest']), 3)
+
+    @override_settings(SQL_SLOW_QUERY_MS=10 ** 6)
+    def test_no_serialization_when_info_is_disabled(self):
+        sql_json = mock.Mock(wraps=json)
+        with mock.patch('core.middleware.sql.json', sql_json):
+            with mock.patch.object(
+                logging.getLogger('yatube.sql'), 'level', logging.WARNING
+            ):
+                self.client.get(reverse('posts:index'))
+        sql_json.dumps.assert_not_called()
+
+    @override_settings(SQL_SLOW_QUERY_MS=0)
+    def test_slow_query_plan(self):
+        """Для медленных запросов в лог попадает план."""
+        with self.assertLogs('yatube.sql', 'WARNING') as logs:
+            self.client.get(reverse('posts:index'))
+        self.assertEqual(len(logs.records), 1)
+        slow = json.loads(logs.records[0].getMessage())
+        self.assertTrue(slow['sql'].startswith('SELECT'))
+        self.assertTrue(slow['plan'])
+
+
+@override_settings(RATE_LIMITS={
+    'posts:post_create': [('user', 2, 60), ('ip', 3, 60)],
+    'users:login': [('ip', 1, 60)],
+    'users:signup': [('ip', 2, 600)],
+})
+class RateLimitTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.other = User.objects.create_user(username='other')
+
+    def setUp(self):
+        cache.clear()
+        caches['ratelimit'].clear()
+        self.addCleanup(caches['ratelimit'].clear)
+        self.url = reverse('posts:post_create')
+
+    def post_as(self, user):
+        client = Client()
+        client.force_login(user)
+        return client.post(self.url, {'text': 'Пост'})
+
+    def test_user_limit_returns_429_with_retry_after(self):
+        self.assertEqual(self.post_as(self.user).status_code, 302)
+        self.assertEqual(self.post_as(self.user).status_code, 302)
+        response = self.post_as(self.user)
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(1 <= int(response['Retry-After']) <= 60)
+        self.assertEqual(Post.objects.count(), 2)
+
+        # Лимит по IP общий для всех пользователей с этого адреса.
+        self.assertEqual(self.post_as(self.other).status_code, 429)
+
+    def test_safe_methods_are_not_limited(self):
+        client = Client()
+        for _ in range(3):
+            response = client.get(reverse('users:login'))
+            self.assertEqual(response.status_code, 200)
+        client.post(reverse('users:login'), {'username': 'auth'})
+        response = client.post(reverse('users:login'), {'username': 'auth'})
+        self.assertEqual(response.status_code, 429)
+
+    def test_page_cache_churn_does_not_reset_limit(self):
+        """Вытеснение из кэша страниц не сбрасывает счётчики."""
+        client = Client()
+        client.post(reverse('users:login'))
+        cache.clear()
+        response = client.post(reverse('users:login'))
+        self.assertEqual(response.status_code, 429)
+
+    @override_settings(RATELIMIT_PROXY_COUNT=1)
+    def test_clients_behind_proxy_are_counted_apart(self):
+        url = reverse('users:login')
+
+        def login(forwarded_for):
+            return Client(
+                REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=forwarded_for
+            ).post(url)
+
+        self.assertEqual(login('203.0.113.1').status_code, 200)
+        self.assertEqual(login('203.0.113.2').status_code, 200)
+        # Подделанный адрес слева не помогает: считается последний.
+        self.assertEqual(login('1.1.1.1, 203.0.113.1').status_code, 429)
+
+    def test_window_outlives_cache_timeout(self):
+        """Счётчик живёт до конца окна, а не TIMEOUT кэша (300 с)."""
+        url = reverse('users:signup')
+        start = 600 * 3000000 + 5
+        for moment in (start, start + 1):
+            with mock.patch('time.time', return_value=moment):
+                self.assertEqual(Client().post(url).status_code, 200)
+        with mock.patch('time.time', return_value=start + 310):
+            response = Client().post(url)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '285')
+        with mock.patch('time.time', return_value=start + 600):
+            self.assertEqual(Client().post(url).status_code, 200)
+
+    def test_cache_without_atomic_incr_is_rejected(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(CACHES={
+                **settings.CACHES,
+                'ratelimit': {
+                    'BACKEND': (
+                        'django.core.cache.backends.filebased.FileBasedCache'
+                    ),
+                    'LOCATION': directory,
+                },
+            }):
+                with self.assertRaises(ImproperlyConfigured):
+                    RateLimitMiddleware(lambda request: None)
+
+    def test_happy_path_costs_no_queries(self):
+        client = Client()
+        with self.assertNumQueries(0):
+            client.post(reverse('users:login'))
+
+
+class ProfilingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.create(author=cls.user, text='Текст поста')
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.settings_override = override_settings(
+            PROFILING_DIR=self.directory.name
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def get(self, user, **extra):
+        client = Client()
+        client.force_login(user)
+        return client.get(reverse('posts:index'), **extra)
+
+    def test_pstats_profile_for_staff(self):
+        response = self.get(self.staff, data={'profile': '1'})
+        name = response['X-Profile']
+        base = os.path.join(self.directory.name, name)
+        self.assertTrue(os.path.getsize(f'{base}.prof'))
+        with open(f'{base}.json') as summary:
+            summary = json.load(summary)
+        self.assertEqual(summary['view'], 'posts:index')
+        self.assertGreater(summary['queries'], 0)
+        self.assertGreater(summary['template_ms'], 0)
+
+    def test_collapsed_stacks_by_header(self):
+        response = self.get(self.staff, HTTP_X_PROFILE='collapsed')
+        base = os.path.join(self.directory.name, response['X-Profile'])
+        self.assertTrue(os.path.exists(f'{base}.collapsed'))
+        with open(f'{base}.json') as summary:
+            self.assertEqual(json.load(summary)['mode'], 'collapsed')
+
+    def test_stack_sampler_writes_collapsed_stacks(self):
+        sampler = StackSampler(threading.get_ident(), 0.001)
+        sampler.start()
+        deadline = time.monotonic() + 0.05
+        while time.monotonic() < deadline:
+            pass
+        sampler.stop()
+        path = os.path.join(self.directory.name, 'stacks.collapsed')
+        sampler.write(path)
+        with open(path) as stacks:
+            line = stacks.readline()
+        self.assertRegex(line, r'^\S.*;.*test_stack_sampler.* \d+$')
+
+    def test_not_profiled_without_trigger_or_staff(self):
+        self.assertNotIn('X-Profile', self.get(self.staff))
+        response = self.get(self.user, data={'profile': '1'})
+        self.assertNotIn('X-Profile', response)
+        self.assertEqual(os.listdir(self.directory.name), [])
@@ -1,21 +1,83 @@
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
 
 from .models import Post, Group
+from .paginators import EstimatedCountPaginator
+from .search import search_posts
+
+
+class LoadedAutocompleteSelect(AutocompleteSelect):
+    """Автокомплит, который берёт выбранный объект из уже загруженных.
+
+    Обычный AutocompleteSelect в list_editable делает по запросу
+    на строку, чтобы показать подпись выбранного значения.
+    """
+
+    def __init__(self, *args, loaded, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.loaded = loaded
+
+    def optgroups(self, name, value, attr=None):
+        selected = {
+            str(pk) for pk in value
+            if str(pk) not in self.choices.field.empty_values
+        }
+        if not selected <= self.loaded.keys():
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        for pk in selected:
+            label = self.choices.field.label_from_instance(self.loaded[pk])
+            options.append(
+                self.create_option(name, pk, label, True, len(options))
+            )
+        return [(None, options, 0)]
 
 
 class PostAdmin(admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    # Индекс post_pub_date_idx.
+    date_hierarchy = 'pub_date'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return search_posts(queryset, search_term), False
+
+    def get_changelist_instance(self, request):
+        changelist = super().get_changelist_instance(request)
+        # Группы строк уже загружены через list_select_related.
+        request.loaded_groups = {
+            str(post.group_id): post.group
+            for post in changelist.result_list if post.group_id
+        }
+        return changelist
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'group' and hasattr(request, 'loaded_groups'):
+            kwargs['widget'] = LoadedAutocompleteSelect(
+                db_field.remote_field, self.admin_site,
+                using=kwargs.get('using'), loaded=request.loaded_groups,
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
 
 class GroupAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'title', 'slug', 'description')
+    list_display = ('pk', 'title', 'slug', 'description', 'posts_count')
     list_editable = ()
-    search_fields = ('title',)
+    search_fields = ('title', 'slug')
     list_filter = ()
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
 
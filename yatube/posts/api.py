@@ -0,0 +1,227 @@
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import Max
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET
+
+from .delta import raise_high_water_marks, wait_for_posts
+from .models import AuthorCounter, Group, Post, User
+from .objects import get_cached_object_or_404
+from .paginators import CursorPaginator
+
+MAX_BATCH_IDS = 100
+
+# Поле API -> (колонки для only(), связь для select_related, значение).
+POST_FIELDS = {
+    'id': (('id',), None, lambda post: post.pk),
+    'text': (('text',), None, lambda post: post.text),
+    'html': (
+        ('text', 'text_html', 'text_html_version'), None,
+        lambda post: str(post.html),
+    ),
+    'pub_date': (
+        ('pub_date',), None, lambda post: post.pub_date.isoformat()
+    ),
+    'author': (
+        ('author__username',), 'author',
+        lambda post: post.author.username if post.author_id else None,
+    ),
+    'group': (
+        ('group__slug',), 'group',
+        lambda post: post.group.slug if post.group_id else None,
+    ),
+}
+
+GROUP_FIELDS = ('id', 'title', 'slug', 'description', 'posts_count')
+
+
+class BadRequest(Exception):
+    pass
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data, status=status, json_dumps_params={'ensure_ascii': False}
+    )
+
+
+def api_error(message, status=400):
+    return json_response({'detail': message}, status=status)
+
+
+def requested_fields(request, available):
+    if not request.GET.get('fields'):
+        return list(available)
+    fields = request.GET['fields'].split(',')
+    unknown = set(fields) - set(available)
+    if unknown:
+        raise BadRequest(f'Неизвестные поля: {", ".join(sorted(unknown))}')
+    return fields
+
+
+def post_queryset(fields):
+    """Посты, у которых загружены только колонки нужных полей."""
+    columns = {'id', 'pub_date', 'author', 'group'}
+    related = set()
+    for field in fields:
+        field_columns, relation, _ = POST_FIELDS[field]
+        columns.update(field_columns)
+        if relation:
+            related.add(relation)
+    queryset = Post.objects.only(*columns)
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset
+
+
+def serialize_post(post, fields):
+    return {field: POST_FIELDS[field][2](post) for field in fields}
+
+
+def serialize_page(page_obj, serialize):
+    return {
+        'results': [serialize(item) for item in page_obj],
+        'next': page_obj.next_cursor,
+        'previous': page_obj.previous_cursor,
+    }
+
+
+def api_view(view):
+    @require_GET
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as error:
+            return api_error(str(error))
+        except Http404:
+            return api_error('Не найдено.', status=404)
+    return wrapper
+
+
+@api_view
+def post_list(request):
+    """Лента постов курсором либо пачка постов по ?ids= одним запросом."""
+    fields = requested_fields(request, POST_FIELDS)
+    posts = post_queryset(fields)
+
+    if 'ids' in request.GET:
+        try:
+            ids = [int(pk) for pk in request.GET['ids'].split(',') if pk]
+        except ValueError:
+            raise BadRequest('ids должен быть списком чисел') from None
+        if len(ids) > MAX_BATCH_IDS:
+            raise BadRequest(f'Не больше {MAX_BATCH_IDS} ids за запрос')
+        found = posts.in_bulk(ids)
+        return json_response({'results': [
+            serialize_post(found[pk], fields) for pk in ids if pk in found
+        ]})
+
+    if request.GET.get('author'):
+        posts = posts.filter(author__username=request.GET['author'])
+    if request.GET.get('group'):
+        posts = posts.filter(group__slug=request.GET['group'])
+    page_obj = CursorPaginator(posts, settings.PAGE_NUM).get_cursor_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    return json_response(
+        serialize_page(page_obj, lambda post: serialize_post(post, fields))
+    )
+
+
+def int_param(request, name, default=0):
+    try:
+        return int(request.GET.get(name, default))
+    except ValueError:
+        raise BadRequest(f'{name} должен быть числом') from None
+
+
+@api_view
+def post_delta(request):
+    """Посты новее since_id либо только их число (?count=1).
+
+    ?wait=N держит запрос до N секунд (не больше DELTA_MAX_WAIT), пока
+    не появится новый пост. Пока новых постов нет, ответ строится по
+    отметке в кэше без обращения к базе. count считается не дальше
+    DELTA_MAX_COUNT постов, поэтому запрос без since_id не пересчитывает
+    всю таблицу.
+    """
+    since_id = int_param(request, 'since_id')
+    wait = min(max(int_param(request, 'wait'), 0), settings.DELTA_MAX_WAIT)
+    fields = requested_fields(request, POST_FIELDS)
+    group = None
+    if request.GET.get('group'):
+        group = get_cached_object_or_404(Group, 'slug', request.GET['group'])
+
+    mark = wait_for_posts(since_id, group and group.pk, wait)
+    if mark <= since_id:
+        return json_response({'count': 0, 'results': [], 'last_id': since_id})
+
+    posts = Post.objects.filter(pk__gt=since_id)
+    if group is not None:
+        posts = posts.filter(group=group)
+    data = {
+        'count': posts.order_by('pk')[:settings.DELTA_MAX_COUNT].count(),
+        'last_id': posts.aggregate(last_id=Max('pk'))['last_id'],
+    }
+    if data['last_id'] is None:
+        data['last_id'] = since_id
+    elif data['last_id'] > mark:
+        # Отметку обогнала параллельная запись — догоняем её.
+        raise_high_water_marks(
+            data['last_id'], [group.pk] if group is not None else []
+        )
+    if not request.GET.get('count'):
+        newest = post_queryset(fields).filter(pk__in=posts).order_by(
+            '-pub_date', '-id'
+        )[:settings.PAGE_NUM]
+        data['results'] = [serialize_post(post, fields) for post in newest]
+    return json_response(data)
+
+
+@api_view
+def post_item(request, post_id):
+    fields = requested_fields(request, POST_FIELDS)
+    post = get_object_or_404(post_queryset(fields), pk=post_id)
+    return json_response(serialize_post(post, fields))
+
+
+@api_view
+def group_list(request):
+    fields = requested_fields(request, GROUP_FIELDS)
+    page_obj = CursorPaginator(
+        Group.objects.only('id', *fields), settings.PAGE_NUM, keys=('id',)
+    ).get_cursor_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    return json_response(serialize_page(
+        page_obj,
+        lambda group: {field: getattr(group, field) for field in fields},
+    ))
+
+
+@api_view
+def group_item(request, slug):
+    fields = requested_fields(request, GROUP_FIELDS)
+    group = get_object_or_404(Group.objects.only('id', *fields), slug=slug)
+    return json_response(
+        {field: getattr(group, field) for field in fields}
+    )
+
+
+@api_view
+def profile_item(request, username):
+    author = get_object_or_404(
+        User.objects.select_related('post_counter'), username=username
+    )
+    posts_count = AuthorCounter.posts_count_for(author)
+    return json_response({
+        'username': author.username,
+        'full_name': author.get_full_name(),
+        'posts_count': posts_count,
+        'followers_count': author.post_counter.followers_count,
+    })
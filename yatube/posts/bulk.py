@@ -0,0 +1,81 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, DateTimeField, Max, Value, When
+
+from .cache import bump_versions, version_key
+from .counters import change_posts_count
+from .delta import raise_high_water_marks
+from .models import Post
+from .rendering import render_post
+from .tags import index_posts
+
+# Каждый пост — три параметра UPDATE; SQLite допускает до 999.
+UPDATE_BATCH = 300
+
+
+def insert_posts(posts, last_pk, batch_size=None):
+    """bulk_create постов с их собственными pub_date.
+
+    auto_now_add перезаписывает pub_date при вставке, а выключать его
+    у поля модели нельзя: это задело бы save() в других потоках. Поэтому
+    даты из постов ставятся следом одним UPDATE ... CASE на пачку.
+    Ключи вставленных постов, если база их не вернула, — первые после
+    last_pk: внутри транзакции SQLite выдаёт их подряд.
+    """
+    batch_size = min(batch_size or UPDATE_BATCH, UPDATE_BATCH)
+    for start in range(0, len(posts), batch_size):
+        batch = posts[start:start + batch_size]
+        dates = [post.pub_date for post in batch]
+        Post.objects.bulk_create(batch)
+        if batch[0].pk is None:
+            pks = Post.objects.filter(pk__gt=last_pk).order_by(
+                'pk'
+            ).values_list('pk', flat=True)[:len(batch)]
+            for post, pk in zip(batch, pks):
+                post.pk = pk
+        last_pk = batch[-1].pk
+        dated = {}
+        for post, date in zip(batch, dates):
+            if date is not None:
+                post.pub_date = dated[post.pk] = date
+        if dated:
+            Post.objects.filter(pk__in=dated).update(pub_date=Case(
+                *(When(pk=pk, then=Value(date)) for pk, date in dated.items()),
+                output_field=DateTimeField(),
+            ))
+
+
+@transaction.atomic
+def bulk_create_posts(posts, batch_size=None):
+    """Вставляет посты пачкой и делает то, что для одиночной записи
+    делают сигналы: рисует HTML, обновляет счётчики, теги и версии кэша.
+
+    Возвращает queryset вставленных постов. Их ключи определяются как
+    всё, что больше прежнего максимума: внутри транзакции SQLite
+    выдаёт их подряд.
+    """
+    last_pk = Post.objects.aggregate(last_pk=Max('pk'))['last_pk'] or 0
+    for post in posts:
+        render_post(post)
+    insert_posts(posts, last_pk, batch_size)
+
+    authors = Counter(post.author_id for post in posts)
+    groups = Counter(
+        post.group_id for post in posts if post.group_id is not None
+    )
+    for author_id, total in authors.items():
+        change_posts_count(author_id, None, total)
+    for group_id, total in groups.items():
+        change_posts_count(None, group_id, total)
+    bump_versions(
+        version_key('feed'),
+        *(version_key('author-feed', pk) for pk in authors),
+        *(version_key('group-feed', pk) for pk in groups),
+    )
+    created = Post.objects.filter(pk__gt=last_pk)
+    index_posts(created.only('id', 'text', 'pub_date'))
+    new_last_pk = created.aggregate(last_pk=Max('pk'))['last_pk']
+    if new_last_pk is not None:
+        raise_high_water_marks(new_last_pk, groups)
+    return created
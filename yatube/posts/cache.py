@@ -0,0 +1,54 @@
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+
+
+def version_key(scope, ident=''):
+    return f'posts:version:{scope}:{ident}'
+
+
+def _now_version():
+    return int(time.time() * 1000)
+
+
+def get_versions(keys):
+    """Текущие версии для ключей; недостающие создаются.
+
+    Версия — время последнего изменения в миллисекундах (или более
+    позднее), поэтому её можно использовать и как Last-Modified. Версия,
+    потерянная при вытеснении из кэша, создаётся заново текущим временем
+    и не может совпасть со старой.
+    """
+    versions = cache.get_many(keys)
+    missing = {key: _now_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return versions
+
+
+def bump_versions(*keys):
+    """Инвалидирует всё, что построено на данных версиях."""
+    now = _now_version()
+    current = cache.get_many(keys)
+    cache.set_many(
+        {key: max(now, current.get(key, 0) + 1) for key in keys}, None
+    )
+
+
+def versions_timestamp(versions):
+    """Время самого позднего изменения среди версий."""
+    return datetime.fromtimestamp(
+        max(versions.values()) / 1000, tz=timezone.utc
+    )
+
+
+def post_version_keys(post):
+    keys = [
+        version_key('post', post.pk),
+        version_key('author', post.author_id),
+    ]
+    if post.group_id is not None:
+        keys.append(version_key('group', post.group_id))
+    return keys
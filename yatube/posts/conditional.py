@@ -0,0 +1,92 @@
+import hashlib
+
+from django.db.models import OuterRef, Subquery
+from django.views.decorators.http import condition
+
+from .cache import get_versions, versions_timestamp, version_key
+from .models import Group, Post, User
+
+
+def newest_pub_date(**lookup):
+    return Subquery(
+        Post.objects.filter(**lookup).order_by('-pub_date', '-id')
+        .values('pub_date')[:1]
+    )
+
+
+def group_state(slug):
+    row = Group.objects.filter(slug=slug).annotate(
+        newest=newest_pub_date(group=OuterRef('pk'))
+    ).values_list('pk', 'posts_count', 'newest').first()
+    if row is None:
+        return None
+    pk, posts_count, newest = row
+    return (posts_count,), newest, [
+        version_key('group', pk), version_key('group-feed', pk),
+    ]
+
+
+def profile_state(username):
+    row = User.objects.filter(username=username).annotate(
+        newest=newest_pub_date(author=OuterRef('pk'))
+    ).values_list('pk', 'post_counter__posts_count', 'newest').first()
+    if row is None:
+        return None
+    pk, posts_count, newest = row
+    return (posts_count,), newest, [
+        version_key('author', pk), version_key('author-feed', pk),
+    ]
+
+
+def post_state(post_id):
+    row = Post.objects.filter(pk=post_id).values_list(
+        'pub_date', 'author_id', 'group_id',
+        'author__post_counter__posts_count',
+    ).first()
+    if row is None:
+        return None
+    pub_date, author_id, group_id, posts_count = row
+    keys = [
+        version_key('post', post_id),
+        version_key('author', author_id),
+        version_key('author-feed', author_id),
+    ]
+    if group_id is not None:
+        keys.append(version_key('group', group_id))
+    return (posts_count,), pub_date, keys
+
+
+def conditional_page(state_func):
+    """Отвечает 304 на If-None-Match/If-Modified-Since, не рендеря страницу.
+
+    state_func(**kwargs) одним индексным запросом возвращает счётчики,
+    дату свежего поста и ключи версий кэша (их меняет любая правка).
+    ETag собирается из них и пользователя, Last-Modified — из даты поста
+    и времени последнего изменения версий.
+    """
+    def state(request, **kwargs):
+        if not hasattr(request, '_conditional_state'):
+            request._conditional_state = None
+            found = state_func(**kwargs)
+            if found is not None:
+                counters, newest, keys = found
+                versions = get_versions(keys)
+                last_modified = versions_timestamp(versions)
+                if newest is not None:
+                    last_modified = max(last_modified, newest)
+                digest = hashlib.md5(repr((
+                    request.user.pk, counters, newest,
+                    sorted(versions.items()),
+                )).encode()).hexdigest()
+                request._conditional_state = (f'"{digest}"', last_modified)
+        return request._conditional_state
+
+    def etag(request, *args, **kwargs):
+        found = state(request, **kwargs)
+        return found and found[0]
+
+    def last_modified(request, *args, **kwargs):
+        found = state(request, **kwargs)
+        return found and found[1]
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
@@ -0,0 +1,104 @@
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import AuthorCounter, Follow, Group, Post
+from .objects import invalidate_objects
+
+
+def change_posts_count(author_id, group_id, delta):
+    """Сдвигает счётчики постов автора и группы на delta."""
+    if group_id is not None:
+        groups = Group.objects.filter(pk=group_id)
+        if delta < 0:
+            groups = groups.filter(posts_count__gte=-delta)
+        groups.update(posts_count=F('posts_count') + delta)
+        invalidate_objects(Group, [group_id])
+
+    if author_id is None:
+        return
+    counters = AuthorCounter.objects.filter(author_id=author_id)
+    if delta < 0:
+        counters = counters.filter(posts_count__gte=-delta)
+    if not counters.update(posts_count=F('posts_count') + delta) and delta > 0:
+        AuthorCounter.objects.get_or_create(
+            author_id=author_id,
+            defaults={
+                'posts_count': Post.objects.filter(
+                    author_id=author_id).count(),
+            },
+        )
+    invalidate_objects(AuthorCounter, [author_id])
+
+
+def change_followers_count(author_id, delta):
+    counters = AuthorCounter.objects.filter(author_id=author_id)
+    if delta < 0:
+        counters = counters.filter(followers_count__gte=-delta)
+    if not counters.update(
+        followers_count=F('followers_count') + delta
+    ) and delta > 0:
+        AuthorCounter.objects.get_or_create(
+            author_id=author_id,
+            defaults={
+                'posts_count': Post.objects.filter(
+                    author_id=author_id).count(),
+                'followers_count': Follow.objects.filter(
+                    author_id=author_id).count(),
+            },
+        )
+    invalidate_objects(AuthorCounter, [author_id])
+
+
+def move_post(old_relations, new_relations):
+    """Переносит пост между счётчиками при смене автора или группы."""
+    old_author, old_group = old_relations
+    new_author, new_group = new_relations
+    if old_author != new_author:
+        change_posts_count(old_author, None, -1)
+        change_posts_count(new_author, None, 1)
+    if old_group != new_group:
+        change_posts_count(None, old_group, -1)
+        change_posts_count(None, new_group, 1)
+
+
+@transaction.atomic
+def rebuild_posts_counters():
+    """Пересчитывает все счётчики постов по таблице постов."""
+    group_counts = dict(
+        Post.objects.filter(group__isnull=False)
+        .values_list('group').annotate(total=Count('pk')).order_by()
+    )
+    groups = list(Group.objects.only('pk', 'posts_count'))
+    for group in groups:
+        group.posts_count = group_counts.get(group.pk, 0)
+    Group.objects.bulk_update(groups, ['posts_count'], batch_size=500)
+    invalidate_objects(Group, [group.pk for group in groups])
+
+    posts = dict(
+        Post.objects.filter(author__isnull=False)
+        .values_list('author').annotate(total=Count('pk')).order_by()
+    )
+    followers = dict(
+        Follow.objects.values_list('author')
+        .annotate(total=Count('pk')).order_by()
+    )
+    invalidate_objects(
+        AuthorCounter,
+        AuthorCounter.objects.values_list('pk', flat=True).iterator(),
+    )
+    AuthorCounter.objects.all().delete()
+    counters = AuthorCounter.objects.bulk_create(
+        [
+            AuthorCounter(
+                author_id=author_id,
+                posts_count=posts.get(author_id, 0),
+                followers_count=followers.get(author_id, 0),
+            )
+            for author_id in posts.keys() | followers.keys()
+        ],
+        batch_size=500,
+    )
+    invalidate_objects(AuthorCounter, [
+        counter.author_id for counter in counters
+    ])
+    return len(groups), len(counters)
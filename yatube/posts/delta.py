@@ -0,0 +1,59 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+
+from .models import Post
+
+
+def high_water_key(group_id=None):
+    return f'posts:high-water:{group_id or ""}'
+
+
+def high_water_mark(group_id=None):
+    """Наибольший id поста в ленте (или группе) без запроса к базе.
+
+    Если отметки нет в кэше, она считается по индексу pk. Отметка живёт
+    DELTA_MARK_TIMEOUT секунд: при локальном кэше воркер, не видевший
+    записи, узнает о новых постах не позже, чем через это время.
+    """
+    key = high_water_key(group_id)
+    mark = cache.get(key)
+    if mark is None:
+        posts = Post.objects.all()
+        if group_id is not None:
+            posts = posts.filter(group_id=group_id)
+        mark = posts.aggregate(mark=Max('pk'))['mark'] or 0
+        cache.add(key, mark, settings.DELTA_MARK_TIMEOUT)
+    return mark
+
+
+def raise_high_water_marks(pk, group_ids=()):
+    """Поднимает отметки ленты и групп до pk.
+
+    Отсутствующие отметки не создаются: их посчитает первый читатель.
+    """
+    keys = [
+        high_water_key(),
+        *(high_water_key(group_id) for group_id in group_ids),
+    ]
+    marks = cache.get_many(keys)
+    cache.set_many(
+        {key: pk for key, mark in marks.items() if mark < pk},
+        settings.DELTA_MARK_TIMEOUT,
+    )
+
+
+def wait_for_posts(since_id, group_id=None, timeout=0):
+    """Ждёт до timeout секунд, пока в ленте не появится пост новее since_id.
+
+    Опрашивает только кэш, поэтому простаивающие клиенты не доходят
+    до базы. Возвращает текущую отметку.
+    """
+    deadline = time.monotonic() + timeout
+    mark = high_water_mark(group_id)
+    while mark <= since_id and time.monotonic() < deadline:
+        time.sleep(settings.DELTA_POLL_INTERVAL)
+        mark = high_water_mark(group_id)
+    return mark
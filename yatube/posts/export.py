@@ -0,0 +1,56 @@
+import csv
+import json
+
+EXPORT_FIELDS = ('id', 'text', 'pub_date', 'author', 'group')
+EXPORT_FORMATS = ('csv', 'jsonl')
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+def iter_posts(queryset, chunk_size=1000):
+    """Строки постов пачками по ключу id.
+
+    Каждая пачка — отдельный запрос WHERE id > последний LIMIT chunk_size,
+    прочитанный через iterator(), так что память не растёт с объёмом.
+    """
+    rows = queryset.order_by('pk').values_list(
+        'pk', 'text', 'pub_date', 'author__username', 'group__slug'
+    )
+    last_pk = 0
+    while True:
+        fetched = 0
+        for row in rows.filter(pk__gt=last_pk)[:chunk_size].iterator(
+            chunk_size=chunk_size
+        ):
+            fetched += 1
+            last_pk = row[0]
+            yield row
+        if fetched < chunk_size:
+            return
+
+
+class _Line:
+    def __init__(self):
+        self.value = ''
+
+    def write(self, value):
+        self.value = value
+
+
+def export_lines(queryset, fmt, chunk_size=1000):
+    """Строки выгрузки в формате fmt; заголовок CSV отдаётся до запроса."""
+    if fmt == 'csv':
+        line = _Line()
+        writer = csv.writer(line)
+        writer.writerow(EXPORT_FIELDS)
+        yield line.value
+        for row in iter_posts(queryset, chunk_size):
+            writer.writerow(row[:2] + (row[2].isoformat(),) + row[3:])
+            yield line.value
+        return
+    for row in iter_posts(queryset, chunk_size):
+        record = dict(zip(EXPORT_FIELDS, row))
+        record['pub_date'] = record['pub_date'].isoformat()
+        yield json.dumps(record, ensure_ascii=False) + '\n'
@@ -0,0 +1,43 @@
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+from .cache import get_versions, post_version_keys
+
+CARD_TIMEOUT = 60 * 60 * 24
+
+
+def attach_cards(posts, template_name):
+    """Проставляет post.card_html каждому посту страницы.
+
+    Готовые карточки берутся из кэша одним get_many, недостающие
+    рендерятся и сохраняются одним set_many. Ключ карточки содержит
+    версии поста, автора и группы, так что правка любого из них
+    делает её недействительной. Возвращает использованные версии.
+    """
+    posts = list(posts)
+    post_keys = {post.pk: post_version_keys(post) for post in posts}
+    versions = get_versions(
+        list({key for keys in post_keys.values() for key in keys})
+    )
+    card_keys = {
+        post.pk: ':'.join([
+            'posts:card', template_name, get_language() or '', str(post.pk),
+            *(str(versions[key]) for key in post_keys[post.pk]),
+        ])
+        for post in posts
+    }
+    cached = cache.get_many(list(card_keys.values()))
+    rendered = {}
+    for post in posts:
+        key = card_keys[post.pk]
+        html = cached.get(key)
+        if html is None:
+            html = rendered[key] = render_to_string(
+                template_name, {'post': post}
+            )
+        post.card_html = mark_safe(html)
+    if rendered:
+        cache.set_many(rendered, CARD_TIMEOUT)
+    return versions
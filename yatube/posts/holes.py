@@ -0,0 +1,57 @@
+import json
+import re
+
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .models import Follow
+
+HOLE_RE = re.compile(rb'<!--hole:(\w+):(.*?)-->')
+
+
+def header_context(request):
+    return {}
+
+
+def follow_button_context(request, username):
+    user = request.user
+    return {
+        'username': username,
+        'show': user.is_authenticated and user.username != username,
+        'following': user.is_authenticated and Follow.objects.filter(
+            user=user, author__username=username
+        ).exists(),
+    }
+
+
+# Имя «дырки» -> (шаблон, функция контекста для текущего пользователя).
+HOLES = {
+    'header': ('includes/header.html', header_context),
+    'follow_button': ('posts/includes/follow_button.html',
+                      follow_button_context),
+}
+
+
+def render_hole(request, name, params):
+    template, get_context = HOLES[name]
+    return render_to_string(
+        template, get_context(request, **params), request=request
+    )
+
+
+def hole_marker(name, params):
+    """Метка на месте персональной части страницы в кэшируемом теле.
+
+    Текст постов экранируется при выводе, поэтому подделать метку
+    из пользовательских данных нельзя.
+    """
+    data = json.dumps(params, separators=(',', ':')).replace('>', r'\u003e')
+    return mark_safe(f'<!--hole:{name}:{data}-->')
+
+
+def fill_holes(request, content):
+    """Заполняет метки в теле страницы для текущего пользователя."""
+    def fill(match):
+        params = json.loads(match.group(2))
+        return render_hole(request, match.group(1).decode(), params).encode()
+    return HOLE_RE.sub(fill, content)
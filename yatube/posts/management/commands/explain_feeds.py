@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from posts.models import Group, Post, User
+from posts.paginators import CursorPaginator
+
+
+def is_range_seek(plan):
+    """Страница после курсора начинается с поиска по диапазону pub_date."""
+    return 'SCAN' not in plan and 'pub_date<?' in plan
+
+
+class Command(BaseCommand):
+    help = (
+        'Печатает EXPLAIN QUERY PLAN для запросов лент и проверяет, '
+        'что они обходятся индексом без сортировки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--group', help='slug группы для group_posts')
+        parser.add_argument('--author', help='username автора для profile')
+
+    def get_feeds(self, options):
+        group = Group.objects.filter(
+            **({'slug': options['group']} if options['group'] else {})
+        ).first()
+        author = User.objects.filter(
+            **({'username': options['author']} if options['author'] else {})
+        ).first()
+        return {
+            'index': Post.objects.select_related('author', 'group'),
+            'group_posts': Post.objects.filter(
+                group_id=group.pk if group else 0
+            ).select_related('author'),
+            'profile': Post.objects.filter(
+                author_id=author.pk if author else 0
+            ).select_related('group'),
+        }
+
+    def handle(self, *args, **options):
+        cursor = [timezone.now(), 0]
+        sorted_feeds = []
+        scanned_feeds = []
+        for name, queryset in self.get_feeds(options).items():
+            paginator = CursorPaginator(queryset, settings.PAGE_NUM)
+            for page, values in (('first', None), ('after', cursor)):
+                plan = paginator.after_queryset(values).explain()
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f'{name} ({page} page)'
+                ))
+                self.stdout.write(plan)
+                if 'TEMP B-TREE' in plan:
+                    sorted_feeds.append(f'{name} ({page} page)')
+                if page == 'after' and not is_range_seek(plan):
+                    scanned_feeds.append(f'{name} ({page} page)')
+        errors = []
+        if sorted_feeds:
+            errors.append('Сортировка без индекса: ' + ', '.join(sorted_feeds))
+        if scanned_feeds:
+            errors.append(
+                'Курсор не ограничивает обход индекса: '
+                + ', '.join(scanned_feeds)
+            )
+        if errors:
+            raise CommandError('\n'.join(errors))
+        self.stdout.write(self.style.SUCCESS(
+            'Все ленты обходятся индексом без сортировки.'
+        ))
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import EXPORT_FORMATS, export_lines
+from posts.models import Group, Post, User
+
+
+class Command(BaseCommand):
+    help = 'Потоково выгружает посты автора, группы или всего сайта.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--author', help='username автора')
+        parser.add_argument('--group', help='slug группы')
+        parser.add_argument(
+            '--format', choices=EXPORT_FORMATS, default='jsonl'
+        )
+        parser.add_argument(
+            '--output', default='-', help='файл; «-» — stdout'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.EXPORT_CHUNK_SIZE
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.all()
+        try:
+            if options['author']:
+                posts = posts.filter(
+                    author=User.objects.get(username=options['author'])
+                )
+            if options['group']:
+                posts = posts.filter(
+                    group=Group.objects.get(slug=options['group'])
+                )
+        except (User.DoesNotExist, Group.DoesNotExist) as error:
+            raise CommandError(error)
+
+        lines = export_lines(posts, options['format'], options['chunk_size'])
+        if options['output'] == '-':
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(
+            options['output'], 'w', newline='', encoding='utf-8'
+        ) as stream:
+            stream.writelines(lines)
@@ -0,0 +1,132 @@
+import csv
+import json
+import sys
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts.bulk import bulk_create_posts
+from posts.models import Group, Post, User
+from posts.validators import validate_empty_field
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково импортирует посты из JSONL или CSV (файл или stdin). '
+        'Поля записи: text, author (username), group (slug, необязательно), '
+        'pub_date (ISO 8601, необязательно). Импортированные посты не '
+        'раздаются в ленты подписок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='путь к файлу; «-» или ничего — читать stdin',
+        )
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'),
+            help='формат входа; по умолчанию определяется по расширению',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def read_records(self, stream, fmt):
+        if fmt == 'csv':
+            yield from enumerate(csv.DictReader(stream), start=2)
+            return
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError as error:
+                yield line_number, error
+
+    def build_posts(self, batch):
+        usernames = {
+            record.get('author') for _, record in batch
+            if isinstance(record, dict)
+        }
+        slugs = {
+            record.get('group') for _, record in batch
+            if isinstance(record, dict) and record.get('group')
+        }
+        authors = dict(
+            User.objects.filter(username__in=usernames)
+            .values_list('username', 'pk')
+        )
+        groups = dict(
+            Group.objects.filter(slug__in=slugs).values_list('slug', 'pk')
+        )
+        now = timezone.now()
+        posts = []
+        for line_number, record in batch:
+            try:
+                posts.append(
+                    self.build_post(record, authors, groups, now)
+                )
+            except (ValidationError, ValueError, TypeError) as error:
+                self.skipped += 1
+                self.stderr.write(f'Строка {line_number}: {error}')
+        return posts
+
+    def build_post(self, record, authors, groups, now):
+        if not isinstance(record, dict):
+            raise ValueError(f'неверная запись ({record})')
+        text = record.get('text') or ''
+        validate_empty_field(text)
+        if record.get('author') not in authors:
+            raise ValueError(f'нет автора «{record.get("author")}»')
+        slug = record.get('group') or None
+        if slug is not None and slug not in groups:
+            raise ValueError(f'нет группы «{slug}»')
+        pub_date = now
+        if record.get('pub_date'):
+            pub_date = parse_datetime(record['pub_date'])
+            if pub_date is None:
+                raise ValueError(f'неверная дата «{record["pub_date"]}»')
+            if timezone.is_naive(pub_date):
+                pub_date = timezone.make_aware(pub_date)
+        return Post(
+            text=text,
+            author_id=authors[record['author']],
+            group_id=groups.get(slug),
+            pub_date=pub_date,
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl'
+        )
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным')
+
+        stream = (
+            sys.stdin if path == '-'
+            else open(path, newline='', encoding='utf-8')
+        )
+        self.imported = self.skipped = 0
+        try:
+            records = self.read_records(stream, fmt)
+            while True:
+                batch = list(islice(records, options['batch_size']))
+                if not batch:
+                    break
+                posts = self.build_posts(batch)
+                if posts:
+                    bulk_create_posts(posts)
+                self.imported += len(posts)
+                self.stdout.write(
+                    f'Импортировано: {self.imported}, '
+                    f'пропущено: {self.skipped}'
+                )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово. Импортировано: {self.imported}, '
+            f'пропущено: {self.skipped}'
+        ))
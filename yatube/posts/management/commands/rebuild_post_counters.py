@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import rebuild_posts_counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов у авторов и групп.'
+
+    def handle(self, *args, **options):
+        groups, authors = rebuild_posts_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано групп: {groups}, авторов: {authors}'
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts.search import fts_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс постов (SQLite FTS5).'
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            self.stdout.write(self.style.WARNING(
+                'Полнотекстовый индекс доступен только для SQLite.'
+            ))
+            return
+        rebuild_index()
+        self.stdout.write(self.style.SUCCESS('Индекс перестроен.'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts.tags import reindex_tags
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестраивает хэштеги постов по их текстам и удаляет теги, '
+        'которые больше не встречаются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        total = reindex_tags(options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс тегов перестроен, связей: {total}'
+        ))
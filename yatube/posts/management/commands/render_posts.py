@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.cache import bump_versions, version_key
+from posts.models import Post
+from posts.rendering import CURRENT_VERSION, render_post
+
+
+class Command(BaseCommand):
+    help = (
+        'Перерисовывает сохранённый HTML постов, у которых он устарел '
+        '(или всех с --all). Работает пачками и не блокирует сайт: '
+        'до перерисовки такие посты рендерятся на лету.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='перерисовать все посты, а не только устаревшие',
+        )
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help='пауза между пачками в секундах',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.only('id', 'text').order_by('pk')
+        if not options['all']:
+            posts = posts.exclude(text_html_version=CURRENT_VERSION)
+        last_pk = 0
+        total = 0
+        while True:
+            chunk = list(
+                posts.filter(pk__gt=last_pk)[:options['chunk_size']]
+            )
+            if not chunk:
+                break
+            for post in chunk:
+                render_post(post)
+            Post.objects.bulk_update(
+                chunk, ['text_html', 'text_html_version']
+            )
+            bump_versions(*(version_key('post', post.pk) for post in chunk))
+            last_pk = chunk[-1].pk
+            total += len(chunk)
+            self.stdout.write(f'Перерисовано постов: {total}')
+            time.sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово, перерисовано постов: {total}'
+        ))
@@ -0,0 +1,157 @@
+import random
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.bulk import bulk_create_posts
+from posts.counters import rebuild_posts_counters
+from posts.models import Group, Post, User
+from posts.timeline import follow
+
+USERNAME_PREFIX = 'bench_user_'
+SLUG_PREFIX = 'bench-group-'
+PASSWORD = 'benchmark'
+FIRST_PUB_DATE = datetime(2021, 1, 1, tzinfo=timezone.utc)
+WORDS = (
+    'yatube пост лента группа автор подписка текст новости день город '
+    'книга фильм музыка код python django кэш индекс запрос страница '
+    '#новости #python #django #кэш'
+).split()
+
+
+def zipf_weights(size, exponent):
+    """Накопленные веса распределения Ципфа: первые элементы популярнее."""
+    return list(
+        accumulate(1 / rank ** exponent for rank in range(1, size + 1))
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт воспроизводимый набор данных для бенчмарков: '
+        'пользователей, группы, посты с перекосом по авторам и подписки. '
+        f'Пароль всех пользователей — «{PASSWORD}».'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument(
+            '--follows', type=int, default=5,
+            help='подписок на пользователя',
+        )
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='показатель распределения Ципфа для авторов и групп',
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='удалить ранее созданные данные бенчмарка',
+        )
+
+    def handle(self, *args, **options):
+        bench_users = User.objects.filter(
+            username__startswith=USERNAME_PREFIX
+        )
+        bench_groups = Group.objects.filter(slug__startswith=SLUG_PREFIX)
+        if options['clear']:
+            bench_users.delete()
+            bench_groups.delete()
+        elif bench_users.exists() or bench_groups.exists():
+            raise CommandError(
+                'Данные бенчмарка уже есть; используйте --clear.'
+            )
+        if min(options['users'], options['posts']) < 1:
+            raise CommandError('Нужен хотя бы один пользователь и пост.')
+
+        rng = random.Random(options['seed'])
+        users = self.create_users(options['users'])
+        groups = self.create_groups(options['groups'])
+        self.create_posts(rng, users, groups, options)
+        self.create_follows(rng, users, options)
+        rebuild_posts_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(users)}, групп: {len(groups)}, '
+            f'постов: {options["posts"]}'
+        ))
+
+    def create_users(self, count):
+        password = make_password(PASSWORD)
+        User.objects.bulk_create(
+            [
+                User(
+                    username=f'{USERNAME_PREFIX}{i}',
+                    first_name=f'Автор{i}',
+                    last_name='Бенчмарков',
+                    password=password,
+                )
+                for i in range(count)
+            ],
+            batch_size=1000,
+        )
+        return list(
+            User.objects.filter(username__startswith=USERNAME_PREFIX)
+            .order_by('pk').values_list('pk', flat=True)
+        )
+
+    def create_groups(self, count):
+        Group.objects.bulk_create(
+            [
+                Group(
+                    title=f'Группа {i}',
+                    slug=f'{SLUG_PREFIX}{i}',
+                    description=f'Описание группы {i}',
+                )
+                for i in range(count)
+            ],
+            batch_size=1000,
+        )
+        return list(
+            Group.objects.filter(slug__startswith=SLUG_PREFIX)
+            .order_by('pk').values_list('pk', flat=True)
+        )
+
+    def create_posts(self, rng, users, groups, options):
+        total = options['posts']
+        author_weights = zipf_weights(len(users), options['skew'])
+        group_weights = zipf_weights(len(groups), options['skew'])
+        step = timedelta(days=365) / total
+        created = 0
+        while created < total:
+            size = min(options['batch_size'], total - created)
+            authors = rng.choices(users, cum_weights=author_weights, k=size)
+            posts = []
+            for offset, author_id in enumerate(authors):
+                number = created + offset
+                posts.append(Post(
+                    text=' '.join(rng.choices(WORDS, k=rng.randint(5, 60))),
+                    author_id=author_id,
+                    group_id=(
+                        rng.choices(groups, cum_weights=group_weights)[0]
+                        if groups and rng.random() < 0.7 else None
+                    ),
+                    pub_date=FIRST_PUB_DATE + step * number,
+                ))
+            bulk_create_posts(posts)
+            created += size
+            self.stdout.write(f'Постов: {created}/{total}')
+
+    def create_follows(self, rng, users, options):
+        count = min(options['follows'], len(users) - 1)
+        if count < 1:
+            return
+        weights = zipf_weights(len(users), options['skew'])
+        by_pk = User.objects.in_bulk(users)
+        for user_id in users:
+            authors = set()
+            while len(authors) < count:
+                author_id = rng.choices(users, cum_weights=weights)[0]
+                if author_id != user_id:
+                    authors.add(author_id)
+            for author_id in sorted(authors):
+                follow(by_pk[user_id], by_pk[author_id])
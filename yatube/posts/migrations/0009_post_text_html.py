@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:01
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+fts = import_module('posts.migrations.0007_post_fts')
+
+# SQLite пересоздаёт posts_post при изменении полей и теряет триггеры
+# полнотекстового индекса; содержимое индекса при этом не меняется.
+restore_fts_triggers = fts.run_sqlite(fts.CREATE_FTS[1:4])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_follow_timeline'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            migrations.RunPython.noop, restore_fts_triggers
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='HTML поста'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Версия HTML'),
+        ),
+        migrations.RunPython(
+            restore_fts_triggers, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_tags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostViewCounter',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='view_counter', serialize=False, to='posts.Post', verbose_name='Пост')),
+                ('views_count', models.PositiveIntegerField(default=0, verbose_name='Число просмотров')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='postviewcounter',
+            index=models.Index(fields=['-views_count', '-post'], name='post_views_count_idx'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from .rendering import post_html
 from .validators import validate_empty_field
 
 User = get_user_model()
@@ -20,6 +21,12 @@ class Group(models.Model):
         verbose_name='Описание',
     )
 
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число постов'
+    )
+
     def __str__(self):
         return self.title
 
@@ -53,8 +60,221 @@ class Post(models.Model):
         verbose_name='Группа'
     )
 
+    text_html = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='HTML поста'
+    )
+
+    text_html_version = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Версия HTML'
+    )
+
     def __str__(self):
         return self.text[:15]
 
+    @property
+    def html(self):
+        return post_html(self)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        instance._loaded_relations = (
+            loaded.get('author_id'), loaded.get('group_id')
+        )
+        return instance
+
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+        ]
+
+
+class AuthorCounter(models.Model):
+    author = models.OneToOneField(
+        User,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='post_counter',
+        verbose_name='Автор'
+    )
+
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число постов'
+    )
+
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число подписчиков'
+    )
+
+    def __str__(self):
+        return f'{self.author}: {self.posts_count}'
+
+    @classmethod
+    def posts_count_for(cls, author):
+        """Число постов автора; недостающий счётчик создаётся по факту."""
+        try:
+            return author.post_counter.posts_count
+        except cls.DoesNotExist:
+            counter, _ = cls.objects.get_or_create(
+                author=author,
+                defaults={'posts_count': author.posts.count()},
+            )
+            author.post_counter = counter
+            return counter.posts_count
+
+
+class Follow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follower',
+        verbose_name='Подписчик'
+    )
+
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following',
+        verbose_name='Автор'
+    )
+
+    def __str__(self):
+        return f'{self.user} -> {self.author}'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow'
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик'
+    )
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации'
+    )
+
+    def __str__(self):
+        return f'{self.user}: {self.post_id}'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx'
+            ),
+        ]
+
+
+class Tag(models.Model):
+    name = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name='Тег'
+    )
+
+    def __str__(self):
+        return f'#{self.name}'
+
+
+class PostTag(models.Model):
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='post_tags',
+        verbose_name='Тег'
+    )
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='post_tags',
+        verbose_name='Пост'
+    )
+
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации'
+    )
+
+    def __str__(self):
+        return f'{self.tag}: {self.post_id}'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tag', 'post'],
+                name='unique_post_tag'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['tag', '-pub_date', '-post'],
+                name='post_tag_pub_date_idx'
+            ),
+        ]
+
+
+class PostViewCounter(models.Model):
+    post = models.OneToOneField(
+        Post,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='view_counter',
+        verbose_name='Пост'
+    )
+
+    views_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число просмотров'
+    )
+
+    def __str__(self):
+        return f'{self.post_id}: {self.views_count}'
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-views_count', '-post'],
+                name='post_views_count_idx'
+            ),
+        ]
@@ -0,0 +1,165 @@
+import copy
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+# Значение в кэше для объекта, которого нет в базе.
+MISSING = '<missing>'
+# Пока другой запрос грузит объект, ждём его LOCK_RETRIES раз по LOCK_WAIT.
+LOCK_RETRIES = 20
+LOCK_WAIT = 0.025
+
+# Кроме pk объекты ищут по этим полям.
+LOOKUP_FIELDS = {
+    'posts.group': 'slug',
+    'auth.user': 'username',
+    'posts.tag': 'name',
+}
+
+
+def object_key(model, pk):
+    return f'object:{model._meta.label_lower}:{pk}'
+
+
+def lookup_key(model, field, value):
+    if field == 'pk':
+        return object_key(model, value)
+    return f'object:{model._meta.label_lower}:{field}:{value}'
+
+
+def instance_keys(instance):
+    """Ключи, которые надо сбросить при изменении объекта."""
+    model = instance._meta.model
+    keys = [object_key(model, instance.pk)]
+    field = LOOKUP_FIELDS.get(model._meta.label_lower)
+    if field:
+        keys.append(lookup_key(model, field, getattr(instance, field)))
+    return keys
+
+
+def invalidate_objects(model, pks):
+    cache.delete_many([object_key(model, pk) for pk in pks])
+
+
+def relation_field(model, name):
+    """Поле связи и способ найти ключ связанного объекта.
+
+    Поддерживаются прямые ForeignKey и обратные OneToOne, у которых
+    связь — первичный ключ (как у AuthorCounter).
+    """
+    field = model._meta.get_field(name)
+    if field.many_to_one:
+        return field, lambda instance: getattr(instance, field.attname)
+    if field.one_to_one and not field.concrete and field.field.primary_key:
+        return field, lambda instance: instance.pk
+    raise ValueError(f'{model.__name__}.{name} нельзя взять из кэша')
+
+
+def collect(instance, entries):
+    """Раскладывает объект и загруженные с ним связанные по ключам."""
+    key = object_key(type(instance), instance.pk)
+    if key in entries:
+        return
+    clean = copy.copy(instance)
+    clean._state = copy.copy(instance._state)
+    clean._state.fields_cache = {}
+    entries[key] = clean
+    fields = {
+        field.get_cache_name(): field
+        for field in instance._meta.get_fields()
+        if hasattr(field, 'get_cache_name')
+    }
+    for name, related in instance._state.fields_cache.items():
+        field = fields[name]
+        if related is not None:
+            collect(related, entries)
+        elif field.one_to_one and not field.concrete:
+            entries[object_key(field.related_model, instance.pk)] = MISSING
+
+
+def attach(instance, names):
+    """Подставляет связанный объект из кэша; False, если его там нет."""
+    field, related_pk = relation_field(type(instance), names[0])
+    pk = related_pk(instance)
+    related = None
+    if pk is not None:
+        related = cache.get(object_key(field.related_model, pk))
+        if related is None:
+            return False
+        if related == MISSING:
+            related = None
+    if related is not None and names[1:]:
+        if not attach(related, names[1:]):
+            return False
+    field.set_cached_value(instance, related)
+    return True
+
+
+def from_cache(model, field, value, related):
+    """Объект из кэша, MISSING для известного 404 и None при промахе."""
+    key = lookup_key(model, field, value)
+    pk = value if field == 'pk' else cache.get(key)
+    if pk is None or pk == MISSING:
+        return pk
+    instance = cache.get(object_key(model, pk))
+    if instance is None or instance == MISSING:
+        return instance
+    # После переименования старый slug указывает на чужой объект.
+    if field != 'pk' and getattr(instance, field) != value:
+        return None
+    for path in related:
+        if not attach(instance, path.split('__')):
+            return None
+    return instance
+
+
+def load(model, field, value, related):
+    queryset = model._default_manager.all()
+    if related:
+        queryset = queryset.select_related(*related)
+    instance = queryset.filter(**{field: value}).first()
+    key = lookup_key(model, field, value)
+    if instance is None:
+        cache.set(key, MISSING, settings.OBJECT_CACHE_MISSING_TIMEOUT)
+        return MISSING
+    entries = {}
+    collect(instance, entries)
+    if field != 'pk':
+        entries[key] = instance.pk
+    cache.set_many(entries, settings.OBJECT_CACHE_TIMEOUT)
+    return instance
+
+
+def get_cached_object(model, field, value, related=()):
+    """Объект по pk, slug или username через кэш; None, если его нет.
+
+    Промахи грузятся из базы одним запросом с select_related(related),
+    а связанные объекты кладутся в кэш по отдельности, чтобы их можно
+    было сбросить по своему ключу. Отсутствие объекта тоже кэшируется
+    на OBJECT_CACHE_MISSING_TIMEOUT. Базу при промахе опрашивает
+    только один запрос: остальные ждут его результата в кэше.
+    """
+    lock = f'{lookup_key(model, field, value)}:lock'
+    for _ in range(LOCK_RETRIES):
+        instance = from_cache(model, field, value, related)
+        if instance is not None:
+            break
+        if cache.add(lock, 1, settings.OBJECT_CACHE_LOCK_TIMEOUT):
+            try:
+                instance = load(model, field, value, related)
+            finally:
+                cache.delete(lock)
+            break
+        time.sleep(LOCK_WAIT)
+    else:
+        instance = load(model, field, value, related)
+    return None if instance == MISSING else instance
+
+
+def get_cached_object_or_404(model, field, value, related=()):
+    instance = get_cached_object(model, field, value, related)
+    if instance is None:
+        raise Http404(f'{model._meta.object_name} не найден')
+    return instance
@@ -0,0 +1,89 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.translation import get_language
+
+from .cache import get_versions
+from .holes import fill_holes
+
+PAGE_CACHE_HEADER = 'X-Page-Cache'
+
+
+def page_key(request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'posts:page:{get_language()}:{path}'
+
+
+def depends_on(request, versions):
+    """Отмечает версии, от которых зависит кэшируемая страница.
+
+    versions — словарь {ключ версии: значение} или список ключей.
+    """
+    if not hasattr(request, 'page_versions'):
+        return
+    if not isinstance(versions, dict):
+        versions = get_versions(list(versions))
+    request.page_versions.update(versions)
+
+
+def cached_page(view, shared_view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        shared = shared_view and settings.PAGE_CACHE_SHARED
+        if (request.method not in ('GET', 'HEAD')
+                or not shared and request.user.is_authenticated):
+            return view(request, *args, **kwargs)
+
+        key = page_key(request)
+        entry = cache.get(key)
+        if entry is not None and (
+            cache.get_many(list(entry['versions'])) == entry['versions']
+        ):
+            response = HttpResponse(
+                fill_holes(request, entry['content']),
+                content_type=entry['content_type'],
+            )
+            response[PAGE_CACHE_HEADER] = 'hit'
+            return response
+
+        request.page_versions = {}
+        request.punch_holes = shared
+        response = view(request, *args, **kwargs)
+        request.punch_holes = False
+        if (response.status_code == 200 and not response.streaming
+                and not response.cookies and request.page_versions):
+            cache.set(key, {
+                'versions': request.page_versions,
+                'content': response.content,
+                'content_type': response['Content-Type'],
+            }, settings.PAGE_CACHE_TIMEOUT)
+        if shared and not response.streaming:
+            response.content = fill_holes(request, response.content)
+        response[PAGE_CACHE_HEADER] = 'miss'
+        return response
+    return wrapper
+
+
+def cache_anonymous_page(view):
+    """Кэширует страницу целиком для анонимных пользователей.
+
+    Запись хранит версии всех данных, из которых собрана страница
+    (см. depends_on), и считается попаданием, только пока ни одна из них
+    не изменилась: запись в ленту инвалидирует ровно затронутые страницы.
+    """
+    return cached_page(view, shared_view=False)
+
+
+def cache_shared_page(view):
+    """Как cache_anonymous_page, но одно тело страницы на всех.
+
+    Персональные части шаблона выводятся тегом {% hole %}: в кэш
+    попадают метки, которые заполняются для каждого пользователя при
+    ответе (см. posts.holes), поэтому авторизованные пользователи
+    получают те же закэшированные страницы, что и анонимные.
+    PAGE_CACHE_SHARED = False возвращает поведение cache_anonymous_page.
+    """
+    return cached_page(view, shared_view=True)
@@ -0,0 +1,318 @@
+import base64
+import binascii
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import connection
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(values):
+    """Упаковывает значения ключа в непрозрачный токен для URL."""
+    raw = json.dumps([
+        value.isoformat() if hasattr(value, 'isoformat') else value
+        for value in values
+    ], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, fields):
+    """Распаковывает токен в значения ключа, приведённые к типам полей."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as error:
+        raise InvalidCursor(token) from error
+    if not isinstance(values, list) or len(values) != len(fields):
+        raise InvalidCursor(token)
+    try:
+        return [field.to_python(value) for field, value in zip(fields, values)]
+    except ValidationError as error:
+        raise InvalidCursor(token) from error
+
+
+def keyset_filter(keys, values, lookup):
+    """Условие «строго после ключа» для лексикографического порядка.
+
+    Для ключей (a, b) и lookup='lt' получается
+    a <= x AND (a < x OR b < y): в отличие от a < x OR (a = x AND b < y)
+    внешняя граница a <= x даёт базе поиск по диапазону индекса,
+    а не обход индекса с начала.
+    """
+    key, value = keys[-1], values[-1]
+    condition = Q(**{f'{key}__{lookup}': value})
+    for key, value in zip(keys[-2::-1], values[-2::-1]):
+        condition = Q(**{f'{key}__{lookup}e': value}) & (
+            Q(**{f'{key}__{lookup}': value}) | condition
+        )
+    return condition
+
+
+def count_key(queryset):
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.md5(repr((sql, params)).encode()).hexdigest()
+    return f'paginator-count:{digest}'
+
+
+def cached_count(queryset):
+    """COUNT(*) запроса, сохранённый в кэше на PAGINATOR_COUNT_TIMEOUT."""
+    key = count_key(queryset)
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.PAGINATOR_COUNT_TIMEOUT)
+    return count
+
+
+def estimated_count(queryset):
+    """Быстрая оценка числа строк для админки.
+
+    Для таблицы целиком в PostgreSQL берётся статистика планировщика,
+    в остальных случаях — закэшированный COUNT(*).
+    """
+    query = queryset.query
+    if connection.vendor == 'postgresql' and not query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row and row[0] >= settings.ESTIMATED_COUNT_MIN:
+            return row[0]
+    return cached_count(queryset)
+
+
+class WindowedPage(Page):
+    def page_window(self):
+        return self.paginator.page_window(self.number)
+
+
+class WindowedPaginator(Paginator):
+    """Paginator, который не считает строки на каждый запрос.
+
+    Число строк берётся из count — готового значения или функции,
+    например поддерживаемого счётчика, — а без него из кэша
+    с коротким сроком жизни. Точный COUNT(*) выполняется, только если
+    от него зависит содержимое страницы: запрошена последняя страница,
+    страница за ней или страница оказалась пустой.
+    """
+
+    window = 2
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        self.count_source = count
+        self.count_is_exact = count is not None
+        super().__init__(object_list, per_page, **kwargs)
+
+    @cached_property
+    def count(self):
+        if self.count_source is None:
+            return cached_count(self.object_list)
+        if callable(self.count_source):
+            return self.count_source()
+        return self.count_source
+
+    def refresh_count(self):
+        """Пересчитывает число строк; False, если оно уже было точным."""
+        if self.count_is_exact:
+            return False
+        self.__dict__['count'] = self.object_list.count()
+        self.__dict__.pop('num_pages', None)
+        self.count_is_exact = True
+        cache.set(
+            count_key(self.object_list), self.count,
+            settings.PAGINATOR_COUNT_TIMEOUT,
+        )
+        return True
+
+    def page(self, number):
+        try:
+            number = self.validate_number(number)
+        except EmptyPage:
+            if not self.refresh_count():
+                raise
+        else:
+            if number == self.num_pages:
+                # Содержимое последней страницы зависит от точного числа.
+                self.refresh_count()
+        page = super().page(number)
+        if not page.object_list and page.number > 1 and self.refresh_count():
+            return super().page(number)
+        return page
+
+    def get_page(self, number):
+        try:
+            return super().get_page(number)
+        except EmptyPage:
+            # Номер прошёл проверку по устаревшему числу из кэша, а после
+            # пересчёта оказался за концом: отдаём последнюю страницу.
+            return self.page(self.num_pages)
+
+    def _get_page(self, *args, **kwargs):
+        return WindowedPage(*args, **kwargs)
+
+    def page_window(self, number):
+        """Номера страниц вокруг текущей плюс первая и последняя.
+
+        Пропуски обозначены None: [1, None, 4, 5, 6, 7, 8, None, 40].
+        """
+        last = self.num_pages
+        start = max(number - self.window, 1)
+        end = min(number + self.window, last)
+        window = list(range(start, end + 1))
+        if start > 2:
+            window.insert(0, None)
+        if start > 1:
+            window.insert(0, 1)
+        if end < last - 1:
+            window.append(None)
+        if end < last:
+            window.append(last)
+        return window
+
+
+class EstimatedCountPaginator(WindowedPaginator):
+    """Paginator админки: число строк по оценке, а не точным COUNT(*)."""
+
+    def __init__(self, object_list, per_page, orphans=0,
+                 allow_empty_first_page=True):
+        super().__init__(
+            object_list, per_page,
+            count=lambda: estimated_count(object_list),
+            orphans=orphans,
+            allow_empty_first_page=allow_empty_first_page,
+        )
+        self.count_is_exact = False
+
+
+class CursorPage(Page):
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        super().__init__(object_list, None, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<Cursor page of {len(self.object_list)} items>'
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class CursorPaginator(WindowedPaginator):
+    """Paginator с режимом постраничного вывода по ключу.
+
+    Помимо обычного get_page(number) умеет отдавать страницы по курсору
+    (?after=/?before=), которые не используют OFFSET и COUNT(*): любая
+    страница стоит столько же, сколько первая.
+    """
+
+    def __init__(self, object_list, per_page, keys=('pub_date', 'id'),
+                 **kwargs):
+        self.keys = tuple(keys)
+        object_list = object_list.order_by(*(f'-{key}' for key in self.keys))
+        super().__init__(object_list, per_page, **kwargs)
+
+    def _key_fields(self):
+        opts = self.object_list.model._meta
+        return [opts.get_field(key) for key in self.keys]
+
+    def _cursor_for(self, item):
+        return encode_cursor([getattr(item, key) for key in self.keys])
+
+    def get_cursor_page(self, after=None, before=None):
+        """Возвращает страницу после/перед курсором.
+
+        Неверный курсор, как и неверный номер в get_page(), приводит
+        к первой странице.
+        """
+        try:
+            if before:
+                return self._page_before(
+                    decode_cursor(before, self._key_fields())
+                )
+            if after:
+                return self._page_after(
+                    decode_cursor(after, self._key_fields())
+                )
+        except InvalidCursor:
+            pass
+        return self._page_after(None)
+
+    def after_queryset(self, values=None):
+        """Запрос строк страницы после ключа values (с одной лишней)."""
+        queryset = self.object_list
+        if values is not None:
+            queryset = queryset.filter(keyset_filter(self.keys, values, 'lt'))
+        return queryset[:self.per_page + 1]
+
+    def before_queryset(self, values):
+        """Запрос строк перед ключом values, ближайшие первыми."""
+        return self.object_list.filter(
+            keyset_filter(self.keys, values, 'gt')
+        ).order_by(*self.keys)[:self.per_page + 1]
+
+    def fetch(self, values=None, backwards=False):
+        """Строки по одну сторону от ключа, ближайшие к нему первыми."""
+        if backwards:
+            return list(self.before_queryset(values))
+        return list(self.after_queryset(values))
+
+    def _page_after(self, values):
+        items = self.fetch(values)
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        return CursorPage(
+            items,
+            self,
+            next_cursor=self._cursor_for(items[-1]) if has_more else None,
+            previous_cursor=(
+                self._cursor_for(items[0])
+                if values is not None and items else None
+            ),
+        )
+
+    def _page_before(self, values):
+        items = self.fetch(values, backwards=True)
+        if not items:
+            return self._page_after(None)
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page][::-1]
+        return CursorPage(
+            items,
+            self,
+            next_cursor=self._cursor_for(items[-1]),
+            previous_cursor=self._cursor_for(items[0]) if has_more else None,
+        )
+
+
+def paginate(request, queryset, per_page=None, count=None):
+    """Страница ленты для запроса.
+
+    Старые ссылки вида ?page=N обслуживаются постранично (count — число
+    строк, если оно известно заранее), всё остальное — курсором.
+    """
+    paginator = CursorPaginator(
+        queryset, per_page or settings.PAGE_NUM, count=count
+    )
+    if 'page' in request.GET:
+        return paginator.get_page(request.GET.get('page'))
+    return paginator.get_cursor_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
@@ -0,0 +1,79 @@
+import re
+from xml.etree import ElementTree
+
+from django.utils.html import escape, linebreaks, urlize
+from django.utils.safestring import mark_safe
+
+try:
+    import markdown
+    from markdown.inlinepatterns import InlineProcessor
+    from markdown.treeprocessors import Treeprocessor
+except ImportError:
+    markdown = InlineProcessor = Treeprocessor = None
+
+# Увеличивается при любом изменении вывода render_text: посты со старой
+# версией перерисовывает команда render_posts.
+RENDERER_VERSION = 1
+# Версия в базе учитывает и то, установлен ли Markdown.
+CURRENT_VERSION = RENDERER_VERSION * 2 + (markdown is not None)
+
+
+URL_RE = r'\bhttps?://[^\s<>"\']*[^\s<>"\'.,;:!?)\]]'
+# Ссылки и картинки только на http(s), почту и адреса сайта:
+# javascript: и прочие схемы из разметки выбрасываются.
+SAFE_URL_RE = re.compile(r'^(?:https?://|mailto:|/|#)[^\x00-\x20]*$')
+
+
+if markdown is not None:
+    class BareLinkProcessor(InlineProcessor):
+        """Автоссылки для адресов без разметки <...>."""
+
+        def handleMatch(self, match, data):
+            link = ElementTree.Element('a')
+            link.set('href', match.group(0))
+            link.set('rel', 'nofollow')
+            link.text = match.group(0)
+            return link, match.start(0), match.end(0)
+
+    class SafeLinksProcessor(Treeprocessor):
+        def run(self, root):
+            for element in root.iter():
+                for attribute in ('href', 'src'):
+                    url = element.get(attribute)
+                    if url is not None and not SAFE_URL_RE.match(url):
+                        del element.attrib[attribute]
+
+
+def render_markdown(text):
+    md = markdown.Markdown(extensions=['nl2br', 'sane_lists'])
+    # Сырой HTML из текста поста не пропускается в разметку.
+    md.preprocessors.deregister('html_block')
+    md.inlinePatterns.deregister('html')
+    # Ниже обычных ссылок, чтобы не трогать адреса внутри них.
+    md.inlinePatterns.register(
+        BareLinkProcessor(URL_RE, md), 'bare_link', 100
+    )
+    md.treeprocessors.register(SafeLinksProcessor(md), 'safe_links', 5)
+    return md.convert(text)
+
+
+def render_text(text):
+    """HTML поста: Markdown с переносами строк и автоссылками.
+
+    Без установленного пакета markdown — абзацы, переносы и ссылки.
+    """
+    if markdown is not None:
+        return render_markdown(text)
+    return linebreaks(urlize(escape(text), nofollow=True))
+
+
+def render_post(post):
+    post.text_html = render_text(post.text)
+    post.text_html_version = CURRENT_VERSION
+
+
+def post_html(post):
+    """Сохранённый HTML поста; устаревший перерисовывается на лету."""
+    if post.text_html_version == CURRENT_VERSION:
+        return mark_safe(post.text_html)
+    return mark_safe(render_text(post.text))
@@ -0,0 +1,139 @@
+import re
+
+from django.core.paginator import Paginator
+from django.db import connection, models
+from django.db.models.expressions import RawSQL
+
+from .paginators import CursorPage, InvalidCursor, decode_cursor, encode_cursor
+
+FTS_TABLE = 'posts_post_fts'
+
+MATCH_IDS_SQL = (
+    f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+)
+
+
+class RawSubquery(RawSQL):
+    """RawSQL для pk__in без собственных скобок.
+
+    Lookup __in сам берёт подзапрос в скобки, а с RawSQL получается
+    «IN ((SELECT ...))», и SQLite берёт из подзапроса только первую строку.
+    """
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(query):
+    """Переводит пользовательский запрос в безопасное выражение FTS5.
+
+    Каждое слово берётся в кавычки, так что операторы и спецсимволы
+    FTS5 из запроса не интерпретируются.
+    """
+    return ' '.join(f'"{word}"' for word in re.findall(r'\w+', query))
+
+
+def search_posts(queryset, query):
+    """Фильтрует queryset постами, текст которых подходит под запрос."""
+    match = match_expression(query)
+    if not match:
+        return queryset.none()
+    if not fts_available():
+        for word in re.findall(r'\w+', query):
+            queryset = queryset.filter(text__icontains=word)
+        return queryset
+    return queryset.filter(pk__in=RawSubquery(MATCH_IDS_SQL, [match]))
+
+
+def rebuild_index():
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+        )
+
+
+class SearchPaginator(Paginator):
+    """Курсорные страницы результатов поиска в порядке релевантности.
+
+    Ключ страницы — (rank, rowid) из FTS5: курсор обходится без OFFSET,
+    но FTS5 всё равно ранжирует все совпадения на каждой странице,
+    так что стоимость страницы растёт с числом найденных постов.
+    """
+
+    key_fields = (models.FloatField(), models.IntegerField())
+
+    def __init__(self, queryset, query, per_page, **kwargs):
+        self.match = match_expression(query)
+        super().__init__(search_posts(queryset, query), per_page, **kwargs)
+        self.posts = queryset
+
+    def _ranked(self, values, ascending):
+        order = 'ASC' if ascending else 'DESC'
+        sql = [f'SELECT rowid, rank FROM {FTS_TABLE} '
+               f'WHERE {FTS_TABLE} MATCH %s']
+        params = [self.match]
+        if values is not None:
+            op = '>' if ascending else '<'
+            sql.append(
+                f'AND (rank {op} %s OR (rank = %s AND rowid {op} %s))'
+            )
+            params += [values[0], values[0], values[1]]
+        sql.append(f'ORDER BY rank {order}, rowid {order} LIMIT %s')
+        params.append(self.per_page + 1)
+        with connection.cursor() as cursor:
+            cursor.execute(' '.join(sql), params)
+            rows = cursor.fetchall()
+        posts = self.posts.in_bulk([pk for pk, _ in rows])
+        items = []
+        for pk, rank in rows:
+            if pk in posts:
+                posts[pk].rank = rank
+                items.append(posts[pk])
+        return items, len(rows) > self.per_page
+
+    def _cursor_for(self, post):
+        return encode_cursor([post.rank, post.pk])
+
+    def get_cursor_page(self, after=None, before=None):
+        if not self.match:
+            return CursorPage([], self)
+        if not fts_available():
+            return CursorPage(list(self.object_list[:self.per_page]), self)
+        try:
+            if before:
+                values = decode_cursor(before, self.key_fields)
+                items, has_more = self._ranked(values, ascending=False)
+                items = items[:self.per_page][::-1]
+                if items:
+                    return CursorPage(
+                        items,
+                        self,
+                        next_cursor=self._cursor_for(items[-1]),
+                        previous_cursor=(
+                            self._cursor_for(items[0]) if has_more else None
+                        ),
+                    )
+                values = None
+            else:
+                values = (
+                    decode_cursor(after, self.key_fields) if after else None
+                )
+        except InvalidCursor:
+            values = None
+        items, has_more = self._ranked(values, ascending=True)
+        items = items[:self.per_page]
+        return CursorPage(
+            items,
+            self,
+            next_cursor=self._cursor_for(items[-1]) if has_more else None,
+            previous_cursor=(
+                self._cursor_for(items[0])
+                if values is not None and items else None
+            ),
+        )
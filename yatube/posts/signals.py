@@ -0,0 +1,112 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.core.cache import cache
+from django.dispatch import receiver
+
+from .cache import bump_versions, version_key
+from .counters import change_posts_count, move_post
+from .delta import raise_high_water_marks
+from .models import AuthorCounter, Group, Post, Tag, User
+from .objects import instance_keys
+from .rendering import render_post
+from .tags import update_post_tags
+from .timeline import fan_out
+
+AUTHOR_CARD_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=Post)
+def update_counters_on_save(sender, instance, created, **kwargs):
+    relations = (instance.author_id, instance.group_id)
+    if created:
+        change_posts_count(*relations, 1)
+        fan_out(instance)
+    else:
+        loaded = getattr(instance, '_loaded_relations', None)
+        if loaded is not None:
+            move_post(loaded, relations)
+    instance._loaded_relations = relations
+
+
+@receiver(post_delete, sender=Post)
+def update_counters_on_delete(sender, instance, **kwargs):
+    change_posts_count(instance.author_id, instance.group_id, -1)
+
+
+def feed_version_keys(author_id, group_id):
+    keys = [version_key('feed'), version_key('author-feed', author_id)]
+    if group_id is not None:
+        keys.append(version_key('group-feed', group_id))
+    return keys
+
+
+@receiver(pre_save, sender=Post)
+def render_text_html(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'text' in update_fields:
+        render_post(instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_feeds(sender, instance, **kwargs):
+    loaded = getattr(instance, '_loaded_relations', None)
+    instance._previous_feeds = feed_version_keys(*loaded) if loaded else []
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    bump_versions(
+        version_key('post', instance.pk),
+        *{
+            *getattr(instance, '_previous_feeds', []),
+            *feed_version_keys(instance.author_id, instance.group_id),
+        },
+    )
+
+
+@receiver(post_save, sender=Post)
+def raise_feed_high_water_marks(sender, instance, **kwargs):
+    raise_high_water_marks(
+        instance.pk,
+        [instance.group_id] if instance.group_id is not None else [],
+    )
+
+
+@receiver(post_save, sender=Post)
+def index_post_tags(sender, instance, created, update_fields=None,
+                    **kwargs):
+    if created or update_fields is None or 'text' in update_fields:
+        update_post_tags(instance, created)
+
+
+@receiver(post_save, sender=User)
+def invalidate_author(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or AUTHOR_CARD_FIELDS & set(update_fields):
+        bump_versions(version_key('author', instance.pk))
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_author(sender, instance, **kwargs):
+    bump_versions(version_key('author', instance.pk))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group(sender, instance, **kwargs):
+    bump_versions(
+        version_key('group', instance.pk),
+        version_key('group-feed', instance.pk),
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=AuthorCounter)
+@receiver(post_delete, sender=AuthorCounter)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_cached_object(sender, instance, **kwargs):
+    cache.delete_many(instance_keys(instance))
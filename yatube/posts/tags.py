@@ -0,0 +1,110 @@
+import re
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .cache import bump_versions, version_key
+from .models import Post, PostTag, Tag
+from .objects import lookup_key
+from .paginators import CursorPaginator, encode_cursor
+
+TAG_RE = re.compile(r'(?<![\w&#])#(\w{1,100})')
+
+
+def extract_tags(text):
+    """Имена хэштегов поста в нижнем регистре, без повторов."""
+    return {name.lower() for name in TAG_RE.findall(text)}
+
+
+def tag_ids(names):
+    """id тегов по именам; недостающие теги создаются."""
+    if not names:
+        return {}
+    ids = dict(Tag.objects.filter(name__in=names).values_list('name', 'pk'))
+    new = names - ids.keys()
+    if new:
+        Tag.objects.bulk_create(
+            [Tag(name=name) for name in new], ignore_conflicts=True
+        )
+        ids.update(
+            Tag.objects.filter(name__in=new).values_list('name', 'pk')
+        )
+        # bulk_create не шлёт сигналов: сбрасываем закэшированные 404.
+        cache.delete_many(
+            [lookup_key(Tag, 'name', name) for name in new]
+        )
+    return ids
+
+
+def bump_tag_feeds(ids):
+    if ids:
+        bump_versions(*(version_key('tag-feed', pk) for pk in ids))
+
+
+def index_posts(posts):
+    """Добавляет теги новых постов пачкой (для bulk-путей)."""
+    names = {post.pk: extract_tags(post.text) for post in posts}
+    ids = tag_ids(set().union(*names.values()))
+    PostTag.objects.bulk_create(
+        [
+            PostTag(tag_id=ids[name], post_id=post.pk, pub_date=post.pub_date)
+            for post in posts
+            for name in names[post.pk]
+        ],
+        ignore_conflicts=True,
+    )
+    bump_tag_feeds(ids.values())
+
+
+@transaction.atomic
+def update_post_tags(post, created=False):
+    """Приводит теги поста к его тексту: добавляет новые, удаляет лишние."""
+    if created:
+        index_posts([post])
+        return
+    wanted = extract_tags(post.text)
+    current = dict(post.post_tags.values_list('tag__name', 'tag_id'))
+    removed = [pk for name, pk in current.items() if name not in wanted]
+    added = tag_ids(wanted - current.keys())
+    if removed:
+        post.post_tags.filter(tag_id__in=removed).delete()
+    PostTag.objects.bulk_create([
+        PostTag(tag_id=pk, post_id=post.pk, pub_date=post.pub_date)
+        for pk in added.values()
+    ])
+    bump_tag_feeds([*removed, *added.values()])
+
+
+@transaction.atomic
+def reindex_tags(chunk_size):
+    """Перестраивает таблицу тегов постов целиком. Возвращает число связей."""
+    PostTag.objects.all().delete()
+    posts = Post.objects.only('id', 'text', 'pub_date').order_by('pk')
+    last_pk = 0
+    while True:
+        chunk = list(posts.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            break
+        index_posts(chunk)
+        last_pk = chunk[-1].pk
+    Tag.objects.filter(post_tags__isnull=True).delete()
+    return PostTag.objects.count()
+
+
+class TagPaginator(CursorPaginator):
+    """Лента тега по таблице связей, упорядоченной как (tag, pub_date)."""
+
+    def __init__(self, tag, per_page):
+        super().__init__(
+            PostTag.objects.filter(tag=tag).select_related(
+                'post__author', 'post__group'
+            ),
+            per_page,
+            keys=('pub_date', 'post_id'),
+        )
+
+    def _cursor_for(self, post):
+        return encode_cursor([post.pub_date, post.pk])
+
+    def fetch(self, values=None, backwards=False):
+        return [entry.post for entry in super().fetch(values, backwards)]
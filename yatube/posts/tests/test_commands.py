@@ -0,0 +1,247 @@
+import json
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.db.models import Q, QuerySet
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from posts.models import AuthorCounter, Group, Post, PostTag, Tag, User
+
+
+class ImportPostsCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='importer')
+        cls.group = Group.objects.create(
+            title='Импорт', slug='import', description='-',
+        )
+
+    def run_import(self, content, suffix, *args):
+        with tempfile.NamedTemporaryFile(
+            'w', suffix=suffix, encoding='utf-8'
+        ) as source:
+            source.write(content)
+            source.flush()
+            call_command(
+                'import_posts', source.name, *args,
+                stdout=StringIO(), stderr=StringIO(),
+            )
+
+    def test_import_jsonl_in_batches(self):
+        """Импорт JSONL пачками обновляет счётчики и пропускает ошибки."""
+        records = [
+            {'text': f'Пост {i}', 'author': 'importer', 'group': 'import'}
+            for i in range(5)
+        ] + [
+            {'text': '', 'author': 'importer'},
+            {'text': 'Чужой', 'author': 'nobody'},
+            {
+                'text': 'Из прошлого', 'author': 'importer',
+                'pub_date': '2015-05-01T10:00:00+00:00',
+            },
+        ]
+        content = '\n'.join(json.dumps(record) for record in records)
+        content += '\n{broken\n'
+        self.run_import(content, '.jsonl', '--batch-size', '2')
+
+        self.assertEqual(Post.objects.count(), 6)
+        self.assertEqual(
+            Post.objects.get(text='Из прошлого').pub_date.year, 2015
+        )
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 5)
+        self.assertEqual(
+            AuthorCounter.objects.get(author=self.user).posts_count, 6
+        )
+
+    def test_import_dates_after_deleted_last_post(self):
+        """SQLite не выдаёт ключ удалённого поста повторно: даты ставятся
+        по настоящим ключам, а не по прежнему максимуму."""
+        Post.objects.create(author=self.user, text='Удалённый').delete()
+        self.run_import('\n'.join(json.dumps({
+            'text': f'Пост {year}', 'author': 'importer',
+            'pub_date': f'{year}-05-01T10:00:00+00:00',
+        }) for year in (2015, 2016, 2017)), '.jsonl', '--batch-size', '2')
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', 'pub_date__year')),
+            [('Пост 2015', 2015), ('Пост 2016', 2016), ('Пост 2017', 2017)],
+        )
+
+    def test_import_keeps_pub_date_auto_for_other_saves(self):
+        """Во время импорта пост, сохранённый обычным save(), получает
+        текущее время: поле модели не переключается на весь процесс."""
+        bulk_create = QuerySet.bulk_create
+        saved = []
+
+        def create_and_save(queryset, objs, *args, **kwargs):
+            created = bulk_create(queryset, objs, *args, **kwargs)
+            if queryset.model is Post and not saved:
+                saved.append(Post(author=self.user, text='Параллельный'))
+                saved[0].save()
+            return created
+
+        with mock.patch.object(QuerySet, 'bulk_create', create_and_save):
+            self.run_import(json.dumps({
+                'text': 'Из прошлого', 'author': 'importer',
+                'pub_date': '2015-05-01T10:00:00+00:00',
+            }), '.jsonl')
+
+        self.assertEqual(
+            Post.objects.get(pk=saved[0].pk).pub_date.year,
+            timezone.now().year,
+        )
+        self.assertEqual(
+            Post.objects.get(text='Из прошлого').pub_date.year, 2015
+        )
+
+    def test_import_csv(self):
+        content = (
+            'text,author,group\n'
+            'Первый,importer,import\n'
+            'Второй,importer,\n'
+        )
+        self.run_import(content, '.csv')
+        self.assertEqual(
+            set(Post.objects.values_list('text', 'group')),
+            {('Первый', self.group.pk), ('Второй', None)},
+        )
+
+
+class ExportPostsCommandTest(TestCase):
+    def test_export_round_trips_through_import(self):
+        """Выгрузка читается обратно командой import_posts."""
+        user = User.objects.create_user(username='exporter')
+        for i in range(3):
+            Post.objects.create(text=f'Пост {i}', author=user)
+        output = StringIO()
+        call_command(
+            'export_posts', '--author', 'exporter', '--chunk-size', '2',
+            stdout=output,
+        )
+        Post.objects.all().delete()
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.jsonl', encoding='utf-8'
+        ) as source:
+            source.write(output.getvalue())
+            source.flush()
+            call_command(
+                'import_posts', source.name,
+                stdout=StringIO(), stderr=StringIO(),
+            )
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            ['Пост 0', 'Пост 1', 'Пост 2'],
+        )
+
+
+class SeedBenchmarkDataCommandTest(TestCase):
+    def seed(self, *args):
+        call_command(
+            'seed_benchmark_data', '--users', '10', '--groups', '3',
+            '--posts', '200', '--follows', '2', '--batch-size', '70',
+            *args, stdout=StringIO(),
+        )
+        return list(Post.objects.order_by('pk').values_list(
+            'text', 'author__username', 'group__slug', 'pub_date'
+        ))
+
+    def test_seed_is_reproducible_and_skewed(self):
+        """Набор данных воспроизводим и перекошен в сторону первых авторов."""
+        first = self.seed()
+        self.assertEqual(len(first), 200)
+        self.assertEqual(first, self.seed('--clear'))
+
+        top = AuthorCounter.objects.get(author__username='bench_user_0')
+        tail = AuthorCounter.objects.get(author__username='bench_user_9')
+        self.assertGreater(top.posts_count, tail.posts_count)
+        self.assertEqual(
+            sum(Group.objects.values_list('posts_count', flat=True)),
+            Post.objects.filter(group__isnull=False).count(),
+        )
+
+
+# Тестовый раннер разрешает только testserver, а команда ходит
+# на localhost, как при запуске с настройками разработки.
+@override_settings(ALLOWED_HOSTS=['localhost'])
+class BenchmarkViewsCommandTest(TestCase):
+    def test_benchmark_reports_every_route(self):
+        call_command(
+            'seed_benchmark_data', '--users', '3', '--groups', '2',
+            '--posts', '30', '--follows', '1', stdout=StringIO(),
+        )
+        out = StringIO()
+        call_command(
+            'benchmark_views', '--iterations', '1', '--warmup', '0',
+            stdout=out, stderr=StringIO(),
+        )
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['meta']['posts'], 30)
+        self.assertEqual(report['meta']['iterations'], 1)
+        names = {row['name'] for row in report['results']}
+        self.assertTrue({
+            'posts:index', 'posts:tag', 'posts:post_detail', 'users:login',
+        } <= names)
+        for row in report['results']:
+            with self.subTest(name=row['name'], client=row['client']):
+                self.assertEqual(set(row), {
+                    'name', 'url', 'client', 'status',
+                    'p50_ms', 'p95_ms', 'mean_ms', 'queries',
+                })
+                self.assertIn(row['status'], (200, 302))
+
+
+class ReindexTagsCommandTest(TestCase):
+    def test_reindex_restores_links_and_drops_orphans(self):
+        user = User.objects.create_user(username='auth')
+        post = Post.objects.create(author=user, text='#один и #два')
+        PostTag.objects.all().delete()
+        Tag.objects.create(name='сирота')
+
+        call_command('reindex_tags', chunk_size=1, stdout=StringIO())
+
+        self.assertEqual(
+            set(post.post_tags.values_list('tag__name', flat=True)),
+            {'один', 'два'},
+        )
+        self.assertFalse(Tag.objects.filter(name='сирота').exists())
+
+
+def unbounded_keyset_filter(keys, values, lookup):
+    """Прежнее условие a < x OR (a = x AND b < y) без границы диапазона."""
+    first, second = keys
+    return Q(**{f'{first}__{lookup}': values[0]}) | Q(
+        **{first: values[0], f'{second}__{lookup}': values[1]}
+    )
+
+
+class ExplainFeedsCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        user = User.objects.create_user(username='auth')
+        group = Group.objects.create(title='Группа', slug='test-slug')
+        Post.objects.create(author=user, group=group, text='Пост')
+
+    def explain(self):
+        out = StringIO()
+        call_command('explain_feeds', stdout=out)
+        return out.getvalue()
+
+    def test_feeds_use_index_range(self):
+        output = self.explain()
+        self.assertIn('Все ленты обходятся индексом без сортировки.', output)
+        self.assertNotIn('Курсор не ограничивает', output)
+
+    def test_unbounded_cursor_fails_command(self):
+        with mock.patch(
+            'posts.paginators.keyset_filter', unbounded_keyset_filter
+        ):
+            with self.assertRaisesMessage(
+                CommandError,
+                'Курсор не ограничивает обход индекса: index (after page)',
+            ):
+                self.explain()
@@ -1,6 +1,11 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
 from django.test import TestCase
 
-from posts.models import Group, Post, User
+from posts.models import AuthorCounter, Group, Post, User
+from posts.rendering import CURRENT_VERSION, render_text
 
 
 class PostModelTest(TestCase):
@@ -61,3 +66,124 @@ class GroupModelTest(TestCase):
                 self.assertEqual(
                     str(group), expected
                 )
+
+
+class PostCountersTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='counter_author')
+        self.group = Group.objects.create(
+            title='group', slug='group', description='description',
+        )
+        self.other_group = Group.objects.create(
+            title='other', slug='other', description='description',
+        )
+        self.post = Post.objects.create(
+            author=self.user, group=self.group, text='post',
+        )
+
+    def assertCounters(self, author, group, other_group):
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(
+            AuthorCounter.objects.get(author=self.user).posts_count, author
+        )
+        self.assertEqual(self.group.posts_count, group)
+        self.assertEqual(self.other_group.posts_count, other_group)
+
+    def test_counters_follow_create_edit_delete(self):
+        """Счётчики постов следуют за созданием, правкой и удалением."""
+        self.assertCounters(1, 1, 0)
+
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = self.other_group
+        post.save()
+        self.assertCounters(1, 0, 1)
+
+        Post.objects.create(author=self.user, text='no group')
+        self.assertCounters(2, 0, 1)
+
+        post.delete()
+        self.assertCounters(1, 0, 0)
+
+    def test_author_cascade_delete(self):
+        self.user.delete()
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertFalse(AuthorCounter.objects.exists())
+
+    def test_rebuild_command(self):
+        Group.objects.update(posts_count=42)
+        AuthorCounter.objects.all().delete()
+        call_command('rebuild_post_counters', stdout=StringIO())
+        self.assertCounters(1, 1, 0)
+
+
+class PostHtmlTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='<b>Текст</b>\nподробнее на http://example.com/page',
+        )
+
+    def test_html_is_rendered_on_save(self):
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.text_html_version, CURRENT_VERSION)
+        self.assertIn('&lt;b&gt;Текст&lt;/b&gt;', post.text_html)
+        self.assertIn('<br', post.text_html)
+        self.assertIn('<a href="http://example.com/page"', post.text_html)
+        self.assertEqual(post.html, post.text_html)
+
+    def test_edit_rerenders_html(self):
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Новый текст'
+        post.save()
+        self.assertIn('Новый текст', Post.objects.get(pk=post.pk).text_html)
+
+    def test_stale_html_is_rendered_on_read(self):
+        Post.objects.filter(pk=self.post.pk).update(
+            text_html='', text_html_version=0
+        )
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertIn('http://example.com/page', post.html)
+
+    def test_render_posts_command_backfills_stale_html(self):
+        Post.objects.filter(pk=self.post.pk).update(
+            text_html='', text_html_version=0
+        )
+        call_command('render_posts', stdout=StringIO())
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.text_html_version, CURRENT_VERSION)
+        self.assertIn('http://example.com/page', post.text_html)
+
+
+class MarkdownRenderingTest(TestCase):
+    def test_markdown_is_rendered(self):
+        html = render_text('**жирный** и [ссылка](/posts/1/)\nстрока')
+        self.assertIn('<strong>жирный</strong>', html)
+        self.assertIn('<a href="/posts/1/">ссылка</a>', html)
+        self.assertIn('<br', html)
+
+    def test_raw_html_is_escaped(self):
+        html = render_text('<script>alert(1)</script>\n\n<div>блок</div>')
+        self.assertNotIn('<script', html)
+        self.assertNotIn('<div', html)
+        self.assertIn('&lt;script&gt;', html)
+
+    def test_unsafe_links_are_dropped(self):
+        html = render_text(
+            '[клик](javascript:alert(1)) ![x](javascript:alert(2)) '
+            'http://example.com/page'
+        )
+        self.assertNotIn('javascript:', html)
+        self.assertIn(
+            '<a href="http://example.com/page" rel="nofollow">', html
+        )
+
+    def test_fallback_without_markdown(self):
+        with mock.patch('posts.rendering.markdown', None):
+            html = render_text('**текст** <b>x</b> http://example.com')
+        self.assertIn('**текст** &lt;b&gt;x&lt;/b&gt;', html)
+        self.assertIn('<a href="http://example.com" rel="nofollow">', html)
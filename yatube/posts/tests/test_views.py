@@ -1,13 +1,36 @@
+import json
+from datetime import timedelta
+from unittest import mock
+
 from django import forms
-from django.test import TestCase, Client
+from django.core.cache import cache
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings
+)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
 
-from posts.models import Post, Group, User
+from posts.bulk import bulk_create_posts
+from posts.delta import high_water_key
+from posts.models import (
+    Follow, Post, Group, PostTag, PostViewCounter, Tag, TimelineEntry,
+    User,
+)
+from posts.objects import get_cached_object, lookup_key
+from posts.paginators import CursorPaginator, count_key
+from posts.search import search_posts
+from posts.tags import TagPaginator
+from posts.timeline import TimelinePaginator
+from posts.view_counts import PopularPaginator, buffer, write_views
 
 from yatube.settings import PAGE_NUM
 
 
+@override_settings(PAGE_CACHE_SHARED=False)
 class PostPagesTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -174,6 +197,7 @@ class PaginatorViewsTest(TestCase):
             for i in range(13)]
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(PaginatorViewsTest.user)
 
@@ -190,3 +214,932 @@ class PaginatorViewsTest(TestCase):
         page_obj = response.context['page_obj']
         number_obj = page_obj.paginator.get_page('2').object_list.count()
         self.assertEqual(number_obj, 3)
+
+    def test_cursor_pages_walk_whole_feed(self):
+        """Курсорные страницы проходят всю ленту без пропусков и повторов."""
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        first_page = response.context['page_obj']
+        self.assertEqual(len(first_page), PAGE_NUM)
+        self.assertFalse(first_page.has_previous())
+
+        response = self.client.get(url, {'after': first_page.next_cursor})
+        second_page = response.context['page_obj']
+        self.assertEqual(len(second_page), 3)
+        self.assertFalse(second_page.has_next())
+        seen = [post.pk for post in first_page] + [
+            post.pk for post in second_page]
+        self.assertEqual(
+            seen,
+            list(Post.objects.order_by('-pub_date', '-id').values_list(
+                'pk', flat=True))
+        )
+
+        response = self.client.get(
+            url, {'before': second_page.previous_cursor}
+        )
+        self.assertEqual(
+            list(response.context['page_obj']), list(first_page)
+        )
+
+    def test_deep_cursor_page_seeks_index_range(self):
+        """Страница после курсора ищет диапазон в индексе, а не сканирует."""
+        paginators = {
+            'index': CursorPaginator(Post.objects.all(), PAGE_NUM),
+            'group': CursorPaginator(self.group.posts.all(), PAGE_NUM),
+            'timeline': TimelinePaginator(self.user, PAGE_NUM),
+            'tag': TagPaginator(Tag.objects.create(name='тег'), PAGE_NUM),
+            'popular': PopularPaginator(PAGE_NUM),
+        }
+        values = [timezone.now(), self.post[5].pk]
+        for name, paginator in paginators.items():
+            with self.subTest(feed=name):
+                if name == 'popular':
+                    values = [10, self.post[5].pk]
+                plan = paginator.after_queryset(values).explain()
+                self.assertRegex(plan, r'SEARCH .*(pub_date|views_count)<\?')
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_invalid_cursor_returns_first_page(self):
+        response = self.client.get(
+            reverse('posts:slug', args=[self.group.slug]),
+            {'after': 'not-a-cursor'}
+        )
+        self.assertEqual(len(response.context['page_obj']), PAGE_NUM)
+
+
+class WindowedPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='auth')
+        cls.group = Group.objects.create(title='Группа', slug='test-slug')
+        now = timezone.now()
+        bulk_create_posts([
+            Post(
+                text=f'Пост №{i}', author=cls.user, group=cls.group,
+                pub_date=now - timedelta(minutes=i),
+            )
+            for i in range(6 * PAGE_NUM)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_page_window(self):
+        paginator = CursorPaginator(Post.objects.all(), 10, count=400)
+        self.assertEqual(
+            paginator.page_window(20),
+            [1, None, 18, 19, 20, 21, 22, None, 40],
+        )
+        self.assertEqual(paginator.page_window(1), [1, 2, 3, None, 40])
+        self.assertEqual(paginator.page_window(3), [1, 2, 3, 4, 5, None, 40])
+        self.assertEqual(paginator.page_window(40), [1, None, 38, 39, 40])
+
+    def test_count_is_cached(self):
+        """Повторный запрос страницы не выполняет COUNT(*)."""
+        with self.assertNumQueries(2):
+            CursorPaginator(Post.objects.all(), PAGE_NUM).get_page(2)
+        with self.assertNumQueries(1):
+            page = CursorPaginator(Post.objects.all(), PAGE_NUM).get_page(2)
+        self.assertEqual(page.paginator.num_pages, 6)
+
+    def test_stale_count_is_refreshed_on_last_page(self):
+        """Устаревшее число в кэше не обрезает последнюю страницу."""
+        cache.set(count_key(Post.objects.order_by('-pub_date', '-id')), 15)
+        page = CursorPaginator(Post.objects.all(), PAGE_NUM).get_page(2)
+        self.assertEqual(len(page), PAGE_NUM)
+        self.assertTrue(page.has_next())
+        page = CursorPaginator(Post.objects.all(), PAGE_NUM).get_page(6)
+        self.assertEqual(page.number, 6)
+
+    def test_page_past_end_after_delete_is_last_page(self):
+        """Удаление постов при закэшированном числе не приводит к 500."""
+        url = reverse('posts:index')
+        self.client.get(url, {'page': 1})
+        Post.objects.filter(
+            pk__in=Post.objects.order_by('pk')[:4 * PAGE_NUM]
+        ).delete()
+        for number in (5, 300):
+            with self.subTest(page=number):
+                response = self.client.get(url, {'page': number})
+                self.assertEqual(response.status_code, 200)
+                page = response.context['page_obj']
+                self.assertEqual(page.number, 2)
+                self.assertEqual(len(page), PAGE_NUM)
+
+    def test_group_page_links_only_window(self):
+        response = self.client.get(
+            reverse('posts:slug', args=[self.group.slug]), {'page': 1}
+        )
+        self.assertContains(response, '?page=3"')
+        self.assertContains(response, '?page=6"')
+        self.assertNotContains(response, '?page=4"')
+        self.assertNotContains(response, '?page=5"')
+
+
+class FeedQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='queries_author')
+        cls.groups = [
+            Group.objects.create(
+                title=f'Группа {i}', slug=f'group-{i}', description='-',
+            )
+            for i in range(3)
+        ]
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {i}',
+                author=(
+                    cls.author if i % 2
+                    else User.objects.create_user(username=f'author_{i}')
+                ),
+                group=cls.groups[i % 3],
+            )
+            for i in range(15)
+        ]
+
+    def test_feed_query_count_does_not_depend_on_page_size(self):
+        """Число запросов ленты не зависит от размера страницы."""
+        urls = {
+            reverse('posts:index'): 1,
+            reverse('posts:slug', args=[self.groups[0].slug]): 3,
+            reverse('posts:profile', args=[self.author.username]): 3,
+            reverse('posts:post_detail', args=[self.posts[0].pk]): 2,
+        }
+        for page_size in (2, 15):
+            for url, queries in urls.items():
+                with self.subTest(url=url, page_size=page_size):
+                    cache.clear()
+                    with override_settings(PAGE_NUM=page_size):
+                        with self.assertNumQueries(queries):
+                            self.client.get(url)
+
+
+class SearchViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='search_author')
+        cls.posts = [
+            Post.objects.create(text=f'Кошки и собаки №{i}', author=cls.user)
+            for i in range(PAGE_NUM + 2)
+        ]
+        cls.other = Post.objects.create(text='Только собаки', author=cls.user)
+
+    def test_search_finds_matching_posts_across_pages(self):
+        """Поиск находит посты и листает результаты курсором."""
+        url = reverse('posts:search')
+        response = self.client.get(url, {'q': 'кошки'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), PAGE_NUM)
+        response = self.client.get(
+            url, {'q': 'кошки', 'after': page_obj.next_cursor}
+        )
+        found = set(page_obj) | set(response.context['page_obj'])
+        self.assertEqual(found, set(self.posts))
+
+    def test_search_is_updated_on_edit_and_delete(self):
+        url = reverse('posts:search')
+        self.other.text = 'Только попугаи'
+        self.other.save()
+        response = self.client.get(url, {'q': 'попугаи'})
+        self.assertEqual(list(response.context['page_obj']), [self.other])
+        self.other.delete()
+        response = self.client.get(url, {'q': 'попугаи'})
+        self.assertEqual(list(response.context['page_obj']), [])
+
+    def test_search_posts_returns_every_match(self):
+        found = search_posts(Post.objects.all(), 'кошки')
+        self.assertEqual(set(found), set(self.posts))
+
+    def test_admin_search_returns_every_match(self):
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'кошки'}
+        )
+        self.assertEqual(
+            set(response.context['cl'].result_list), set(self.posts)
+        )
+
+    def test_search_ignores_fts_syntax(self):
+        response = self.client.get(reverse('posts:search'), {'q': '"(*'})
+        self.assertEqual(response.status_code, 200)
+
+
+# Авторизованному пользователю без общего кэша страниц view выполняется
+# каждый раз, и карточки берутся только из кэша карточек.
+@override_settings(PAGE_CACHE_SHARED=False)
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='card_author', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Карточки', slug='cards', description='-',
+        )
+        cls.post = Post.objects.create(
+            text='Текст карточки', author=cls.user, group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_warm_page_does_not_render_cards(self):
+        """Прогретая страница не рендерит карточки постов заново."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        with mock.patch(
+            'posts.fragments.render_to_string'
+        ) as render_to_string:
+            response = self.client.get(url)
+        self.assertNotIn('X-Page-Cache', response)
+        render_to_string.assert_not_called()
+        self.assertContains(response, 'Текст карточки')
+
+    def get_profile(self):
+        """Страница автора и число заново отрендеренных карточек."""
+        url = reverse('posts:profile', args=[self.user.username])
+        with mock.patch(
+            'posts.fragments.render_to_string', wraps=render_to_string
+        ) as render:
+            response = self.client.get(url)
+        return response, render.call_count
+
+    def test_cards_are_invalidated(self):
+        response, rendered = self.get_profile()
+        self.assertContains(response, 'Лев Толстой')
+        self.assertEqual(rendered, 1)
+        self.assertEqual(self.get_profile()[1], 0)
+
+        self.user.first_name = 'Алексей'
+        self.user.save()
+        response, rendered = self.get_profile()
+        self.assertContains(response, 'Алексей Толстой')
+        self.assertEqual(rendered, 1)
+
+        self.post.text = 'Новый текст'
+        self.post.save()
+        self.assertContains(self.get_profile()[0], 'Новый текст')
+
+        self.group.slug = 'cards-renamed'
+        self.group.save()
+        self.assertContains(
+            self.get_profile()[0], '/group/cards-renamed/'
+        )
+
+
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='cached_author')
+        cls.group = Group.objects.create(
+            title='Кэш', slug='cached', description='-',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая', slug='other-cached', description='-',
+        )
+        cls.post = Post.objects.create(
+            text='Закэшированный пост', author=cls.user, group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:slug', args=[self.group.slug]),
+            'other_group': reverse('posts:slug', args=[self.other_group.slug]),
+            'profile': reverse('posts:profile', args=[self.user.username]),
+            'detail': reverse('posts:post_detail', args=[self.post.pk]),
+        }
+        for url in self.urls.values():
+            self.client.get(url)
+
+    def assertCacheStatus(self, expected):
+        for name, status in expected.items():
+            with self.subTest(page=name):
+                response = self.client.get(self.urls[name])
+                self.assertEqual(response['X-Page-Cache'], status)
+
+    def test_anonymous_pages_are_cached(self):
+        """Повторный запрос анонима отдаётся из кэша."""
+        self.assertCacheStatus({name: 'hit' for name in self.urls})
+
+    def test_new_post_invalidates_only_affected_feeds(self):
+        author = Client()
+        author.force_login(self.user)
+        author.post(
+            reverse('posts:post_create'),
+            {'text': 'Новый пост', 'group': self.other_group.pk},
+        )
+        self.assertCacheStatus({
+            'index': 'miss',
+            'group': 'hit',
+            'other_group': 'miss',
+            'profile': 'miss',
+            'detail': 'miss',
+        })
+
+    def test_authenticated_users_share_cached_feeds(self):
+        """Авторизованным отдаются те же тела с их собственной шапкой."""
+        self.client.force_login(self.user)
+        for name in ('index', 'group', 'profile'):
+            with self.subTest(page=name):
+                response = self.client.get(self.urls[name])
+                self.assertEqual(response['X-Page-Cache'], 'hit')
+                self.assertContains(response, 'Пользователь: cached_author')
+                self.assertNotContains(response, 'Регистрация')
+                self.assertNotContains(response, '<!--hole:')
+        response = self.client.get(self.urls['detail'])
+        self.assertFalse(response.has_header('X-Page-Cache'))
+
+    def test_follow_button_is_personal(self):
+        reader = Client()
+        reader.force_login(User.objects.create_user(username='reader'))
+        response = reader.get(self.urls['profile'])
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertContains(response, 'Подписаться')
+
+        self.client.force_login(self.user)
+        response = self.client.get(self.urls['profile'])
+        self.assertNotContains(response, 'Подписаться')
+
+        response = Client().get(self.urls['profile'])
+        self.assertContains(response, 'Войти')
+        self.assertNotContains(response, 'Подписаться')
+
+
+class FollowFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.star = User.objects.create_user(username='star')
+        cls.old_post = Post.objects.create(
+            text='Старый пост', author=cls.author
+        )
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def feed(self, **params):
+        response = self.client.get(reverse('posts:follow_index'), params)
+        return response.context['page_obj']
+
+    def test_follow_backfills_and_fans_out(self):
+        """Подписка наполняет ленту, новые посты попадают в неё при записи."""
+        self.client.get(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        self.assertEqual(list(self.feed()), [self.old_post])
+
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.reader, post=new_post).exists()
+        )
+        self.assertEqual(list(self.feed()), [new_post, self.old_post])
+
+        self.client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username])
+        )
+        self.assertEqual(list(self.feed()), [])
+
+    def test_cannot_follow_yourself(self):
+        self.client.get(
+            reverse('posts:profile_follow', args=[self.reader.username])
+        )
+        self.assertFalse(Follow.objects.exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0, PAGE_NUM=2)
+    def test_large_authors_are_merged_at_read_time(self):
+        for user in (self.author, self.star):
+            self.client.get(
+                reverse('posts:profile_follow', args=[user.username])
+            )
+        star_posts = [
+            Post.objects.create(text=f'Звезда {i}', author=self.star)
+            for i in range(2)
+        ]
+        self.assertFalse(
+            TimelineEntry.objects.filter(post__author=self.star).exists()
+        )
+        first_page = self.feed()
+        second_page = self.feed(after=first_page.next_cursor)
+        self.assertEqual(
+            list(first_page) + list(second_page),
+            [star_posts[1], star_posts[0], self.old_post],
+        )
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class ExportViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_user(username='admin', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Выгрузка', slug='export', description='-',
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.admin,
+                group=cls.group if i % 2 else None,
+            )
+            for i in range(5)
+        ]
+
+    def export(self, **params):
+        response = self.client.get(reverse('posts:export'), params)
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_requires_staff(self):
+        response = self.client.get(reverse('posts:export'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_export_csv_and_jsonl(self):
+        """Выгрузка отдаёт все посты потоком, с учётом фильтров."""
+        self.client.force_login(self.admin)
+        lines = self.export().splitlines()
+        self.assertEqual(lines[0], 'id,text,pub_date,author,group')
+        self.assertEqual(len(lines), 6)
+
+        lines = self.export(format='jsonl', group='export').splitlines()
+        self.assertEqual(
+            [json.loads(line)['id'] for line in lines],
+            [post.pk for post in self.posts if post.group_id],
+        )
+
+
+class ApiViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='api_author', first_name='Анна', last_name='Каренина'
+        )
+        cls.group = Group.objects.create(
+            title='API', slug='api', description='-',
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.user, group=cls.group,
+            )
+            for i in range(PAGE_NUM + 1)
+        ]
+
+    def test_post_list_pages_with_cursor(self):
+        """Лента API отдаёт посты курсором."""
+        url = reverse('posts:api_posts')
+        first = self.client.get(url).json()
+        self.assertEqual(len(first['results']), PAGE_NUM)
+        second = self.client.get(url, {'after': first['next']}).json()
+        self.assertEqual(
+            [post['id'] for post in second['results']], [self.posts[0].pk]
+        )
+        self.assertIsNone(second['next'])
+
+    def test_sparse_fields_and_batch_fetch_use_one_query(self):
+        ids = [self.posts[3].pk, self.posts[1].pk, 10 ** 6]
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('posts:api_posts'), {
+                'ids': ','.join(map(str, ids)), 'fields': 'id,author',
+            })
+        self.assertEqual(response.json()['results'], [
+            {'id': self.posts[3].pk, 'author': 'api_author'},
+            {'id': self.posts[1].pk, 'author': 'api_author'},
+        ])
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(
+            reverse('posts:api_post', args=[self.posts[0].pk]),
+            {'fields': 'password'},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Неизвестные поля: password', response.content.decode())
+
+    def test_missing_objects_are_json_404(self):
+        urls = (
+            reverse('posts:api_post', args=[10 ** 6]),
+            reverse('posts:api_group', args=['missing']),
+            reverse('posts:api_profile', args=['missing']),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response['Content-Type'], 'application/json')
+                self.assertEqual(response.json(), {'detail': 'Не найдено.'})
+
+    def test_group_and_profile(self):
+        group = self.client.get(
+            reverse('posts:api_group', args=[self.group.slug])
+        ).json()
+        self.assertEqual(group['posts_count'], PAGE_NUM + 1)
+        profile = self.client.get(
+            reverse('posts:api_profile', args=[self.user.username])
+        ).json()
+        self.assertEqual(profile['full_name'], 'Анна Каренина')
+        self.assertEqual(profile['posts_count'], PAGE_NUM + 1)
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='etag_author')
+        cls.group = Group.objects.create(
+            title='ETag', slug='etag', description='-',
+        )
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.user, group=cls.group,
+        )
+        cls.urls = [
+            reverse('posts:slug', args=[cls.group.slug]),
+            reverse('posts:profile', args=[cls.user.username]),
+            reverse('posts:post_detail', args=[cls.post.pk]),
+        ]
+
+    def test_revalidation_costs_one_query(self):
+        """Повторная проверка отвечает 304 одним запросом без рендера."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                with self.assertNumQueries(1):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_edit_changes_etag(self):
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_user(self):
+        url = self.urls[0]
+        etag = self.client.get(url)['ETag']
+        self.client.force_login(self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class ObjectCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(title='Группа', slug='test-slug')
+        cls.post = Post.objects.create(
+            author=cls.user, text='Текст поста', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_post(self):
+        return get_cached_object(
+            Post, 'pk', self.post.pk, related=('author__post_counter', 'group')
+        )
+
+    def test_related_objects_come_from_cache(self):
+        with self.assertNumQueries(1):
+            self.get_post()
+        with self.assertNumQueries(0):
+            post = self.get_post()
+            self.assertEqual(post.author.post_counter.posts_count, 1)
+            self.assertEqual(post.group.slug, self.group.slug)
+
+    def test_counter_change_invalidates(self):
+        self.get_post()
+        Post.objects.create(author=self.user, text='Ещё пост')
+        post = self.get_post()
+        self.assertEqual(post.author.post_counter.posts_count, 2)
+
+    def test_missing_slug_is_cached(self):
+        """404 кэшируется, а созданная группа сразу становится видна."""
+        with self.assertNumQueries(1):
+            self.assertIsNone(get_cached_object(Group, 'slug', 'new'))
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_cached_object(Group, 'slug', 'new'))
+        group = Group.objects.create(title='Новая', slug='new')
+        self.assertEqual(get_cached_object(Group, 'slug', 'new'), group)
+
+    def test_renamed_slug_is_not_served(self):
+        get_cached_object(Group, 'slug', 'test-slug')
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed'
+        group.save()
+        self.assertIsNone(get_cached_object(Group, 'slug', 'test-slug'))
+        self.assertEqual(get_cached_object(Group, 'slug', 'renamed'), group)
+
+    def test_concurrent_miss_waits_for_loader(self):
+        """Пока объект грузит другой запрос, база не опрашивается."""
+        key = lookup_key(Group, 'slug', self.group.slug)
+        cache.add(f'{key}:lock', 1)
+
+        def other_request_loads(seconds):
+            cache.delete(f'{key}:lock')
+            get_cached_object(Group, 'slug', self.group.slug)
+
+        with mock.patch('posts.objects.time.sleep') as sleep:
+            sleep.side_effect = other_request_loads
+            with self.assertNumQueries(1):
+                group = get_cached_object(Group, 'slug', self.group.slug)
+        self.assertEqual(group, self.group)
+        sleep.assert_called_once()
+
+
+class DeltaApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(title='Группа', slug='test-slug')
+        cls.post = Post.objects.create(author=cls.user, text='Старый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('posts:api_post_delta')
+
+    def test_idle_poll_does_not_touch_database(self):
+        self.client.get(self.url, {'since_id': self.post.pk})
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'since_id': self.post.pk})
+        self.assertEqual(
+            response.json(),
+            {'count': 0, 'results': [], 'last_id': self.post.pk},
+        )
+
+    def test_new_posts_and_count(self):
+        self.client.get(self.url, {'since_id': self.post.pk})
+        new = Post.objects.create(
+            author=self.user, text='Новый пост', group=self.group
+        )
+        data = self.client.get(self.url, {'since_id': self.post.pk}).json()
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['last_id'], new.pk)
+        self.assertEqual([post['id'] for post in data['results']], [new.pk])
+
+        data = self.client.get(
+            self.url, {'since_id': self.post.pk, 'count': 1}
+        ).json()
+        self.assertEqual(data, {'count': 1, 'last_id': new.pk})
+
+        data = self.client.get(self.url, {'since_id': 0, 'group': 'test-slug'})
+        self.assertEqual(data.json()['count'], 1)
+
+    def test_long_poll_returns_when_post_appears(self):
+        self.client.get(self.url, {'since_id': self.post.pk})
+
+        def new_post(seconds):
+            Post.objects.create(author=self.user, text='Новый пост')
+
+        with mock.patch('posts.delta.time.sleep', side_effect=new_post):
+            data = self.client.get(
+                self.url, {'since_id': self.post.pk, 'wait': 10}
+            ).json()
+        self.assertEqual(data['count'], 1)
+
+    @override_settings(DELTA_MAX_COUNT=2)
+    def test_count_is_capped(self):
+        for number in range(3):
+            Post.objects.create(author=self.user, text=f'Пост {number}')
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(self.url, {'count': 1}).json()
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(data['last_id'], Post.objects.latest('pk').pk)
+        self.assertTrue(any('LIMIT 2' in q['sql'] for q in queries))
+
+    def test_mark_expires_for_other_workers(self):
+        """Отметка с истёкшим сроком пересчитывается по базе."""
+        self.client.get(self.url, {'since_id': self.post.pk})
+        # Пост записан другим воркером: отметку в этом кэше никто не поднял.
+        with mock.patch('posts.signals.raise_high_water_marks'):
+            new = Post.objects.create(author=self.user, text='Новый пост')
+        data = self.client.get(self.url, {'since_id': self.post.pk}).json()
+        self.assertEqual(data['count'], 0)
+        cache.delete(high_water_key())  # истёк DELTA_MARK_TIMEOUT
+        data = self.client.get(self.url, {'since_id': self.post.pk}).json()
+        self.assertEqual(data['last_id'], new.pk)
+
+    def test_bad_since_id(self):
+        response = self.client.get(self.url, {'since_id': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+
+class PostAdminTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.unused_group = Group.objects.create(
+            title='Группа без постов', slug='unused'
+        )
+        for i in range(3):
+            Post.objects.create(
+                text=f'Пост про попугаев {i}', author=cls.admin,
+                group=Group.objects.create(title=f'Группа {i}', slug=f'g{i}'),
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:posts_post_changelist')
+
+    def changelist_queries(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Группа без постов')
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        before = self.changelist_queries()
+        for i in range(3, 10):
+            Post.objects.create(
+                text=f'Пост {i}', author=self.admin,
+                group=Group.objects.create(title=f'Группа {i}', slug=f'g{i}'),
+            )
+        self.assertEqual(self.changelist_queries(), before)
+
+    def test_fts_search(self):
+        response = self.client.get(self.url, {'q': 'попугаев'})
+        self.assertEqual(len(response.context['cl'].result_list), 3)
+
+
+class TagFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        cache.clear()
+
+    def tags_of(self, post):
+        return set(post.post_tags.values_list('tag__name', flat=True))
+
+    def test_tags_are_parsed_on_create_and_edit(self):
+        post = Post.objects.create(
+            author=self.user, text='#Django и #кэш, не тег: a#b &#39;'
+        )
+        self.assertEqual(self.tags_of(post), {'django', 'кэш'})
+
+        post.text = 'Только #кэш и #python'
+        post.save()
+        self.assertEqual(self.tags_of(post), {'кэш', 'python'})
+
+        post.save(update_fields=['group'])
+        self.assertEqual(self.tags_of(post), {'кэш', 'python'})
+
+    def test_bulk_created_posts_are_indexed(self):
+        now = timezone.now()
+        bulk_create_posts([
+            Post(author=self.user, text=f'#пачка {number}', pub_date=now)
+            for number in range(3)
+        ])
+        self.assertEqual(
+            PostTag.objects.filter(tag__name='пачка').count(), 3
+        )
+
+    def test_tag_page_lists_posts_newest_first(self):
+        client = Client()
+        url = reverse('posts:tag', args=['Python'])
+        self.assertEqual(client.get(url).status_code, 404)
+        now = timezone.now()
+        posts = list(bulk_create_posts([
+            Post(
+                author=self.user, text=f'#python {number}',
+                pub_date=now - timedelta(minutes=number),
+            )
+            for number in range(PAGE_NUM + 2)
+        ]).order_by('-pub_date').values_list('pk', flat=True))
+        Post.objects.create(author=self.user, text='без тегов')
+
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        page = response.context['page_obj']
+        self.assertEqual([post.pk for post in page], posts[:PAGE_NUM])
+        response = client.get(url, {'after': page.next_cursor})
+        self.assertEqual(len(response.context['page_obj']), 2)
+
+    def test_tag_page_is_invalidated_by_new_post(self):
+        client = Client()
+        Post.objects.create(author=self.user, text='#новости раз')
+        url = reverse('posts:tag', args=['новости'])
+        client.get(url)
+        self.assertNotIn('два'.encode(), client.get(url).content)
+        Post.objects.create(author=self.user, text='#новости два')
+        self.assertIn('два'.encode(), client.get(url).content)
+        self.assertEqual(Tag.objects.filter(name='новости').count(), 1)
+
+
+@override_settings(VIEW_COUNTS_FLUSH_SIZE=3, VIEW_COUNTS_FLUSH_INTERVAL=3600)
+class PostViewCountTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Пост {number}')
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        buffer.reset()
+
+    def tearDown(self):
+        buffer.reset()
+
+    def views_of(self, post):
+        return PostViewCounter.objects.filter(
+            post=post
+        ).values_list('views_count', flat=True).first()
+
+    def test_views_are_flushed_in_batches(self):
+        url = reverse('posts:post_detail', args=[self.posts[0].pk])
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertIsNone(self.views_of(self.posts[0]))
+
+        self.client.get(url)
+        self.assertEqual(self.views_of(self.posts[0]), 3)
+
+        self.client.get(reverse('posts:post_detail', args=[0]))
+        self.assertEqual(buffer.pending, 0)
+
+    def test_add_starts_flush_timer(self):
+        buffer.add(self.posts[0].pk)
+        self.assertIsNotNone(buffer.timer)
+        self.assertEqual(buffer.timer.interval, 3600)
+
+    def test_write_is_one_case_update(self):
+        first, second, third = self.posts
+        write_views({first.pk: 1, second.pk: 1})
+        with CaptureQueriesContext(connection) as queries:
+            write_views({first.pk: 2, second.pk: 5})
+        self.assertEqual(len(queries), 1)
+        self.assertIn('CASE', queries[0]['sql'])
+        self.assertEqual(self.views_of(first), 3)
+        self.assertEqual(self.views_of(second), 6)
+
+        write_views({third.pk: 4, 0: 1})
+        self.assertEqual(self.views_of(third), 4)
+        self.assertFalse(PostViewCounter.objects.filter(pk=0).exists())
+
+    def test_popular_page(self):
+        first, second, third = self.posts
+        write_views({first.pk: 1, second.pk: 7, third.pk: 3})
+        url = reverse('posts:popular')
+        response = self.client.get(url)
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            [second.pk, third.pk, first.pk],
+        )
+        write_views({first.pk: 10})
+        response = self.client.get(url)
+        self.assertEqual(response.context['page_obj'][0].pk, first.pk)
+
+
+@override_settings(VIEW_COUNTS_FLUSH_SIZE=100, VIEW_COUNTS_FLUSH_INTERVAL=0.2)
+class PostViewCountTimerTest(TransactionTestCase):
+    def setUp(self):
+        buffer.reset()
+
+    def tearDown(self):
+        buffer.reset()
+
+    def test_idle_buffer_is_flushed_by_timer(self):
+        """Просмотры записываются по таймеру, даже если запросов больше нет."""
+        user = User.objects.create_user(username='auth')
+        post = Post.objects.create(author=user, text='Пост')
+        buffer.add(post.pk)
+        timer = buffer.timer
+        timer.join(5)
+        buffer.add(post.pk)
+        buffer.timer.join(5)
+        self.assertEqual(
+            PostViewCounter.objects.get(post=post).views_count, 2
+        )
+        self.assertIsNone(buffer.timer)
@@ -0,0 +1,118 @@
+from django.conf import settings
+from django.db import transaction
+
+from .cache import bump_versions, version_key
+from .counters import change_followers_count
+from .models import AuthorCounter, Follow, Post, TimelineEntry
+from .paginators import CursorPaginator, encode_cursor
+
+
+def is_fanned_out(author_id):
+    """Раздаются ли посты автора в ленты подписчиков при записи.
+
+    Посты авторов с очень большим числом подписчиков не копируются
+    в ленты, а подмешиваются при чтении.
+    """
+    return not AuthorCounter.objects.filter(
+        author_id=author_id,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).exists()
+
+
+def fan_out(post):
+    """Добавляет пост в ленты подписчиков автора пачками."""
+    if not is_fanned_out(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).order_by('pk')
+    last_pk = 0
+    while True:
+        chunk = list(
+            followers.filter(pk__gt=last_pk).values_list('pk', 'user_id')[
+                :settings.TIMELINE_FANOUT_CHUNK]
+        )
+        if not chunk:
+            break
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(
+                    user_id=user_id, post_id=post.pk, pub_date=post.pub_date
+                )
+                for _, user_id in chunk
+            ],
+            ignore_conflicts=True,
+        )
+        last_pk = chunk[-1][0]
+
+
+@transaction.atomic
+def follow(user, author):
+    _, created = Follow.objects.get_or_create(user=user, author=author)
+    if not created:
+        return
+    change_followers_count(author.pk, 1)
+    bump_versions(version_key('author-feed', author.pk))
+    if is_fanned_out(author.pk):
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(user=user, post_id=pk, pub_date=pub_date)
+                for pk, pub_date in author.posts.order_by(
+                    '-pub_date', '-id'
+                ).values_list('pk', 'pub_date')[:settings.TIMELINE_BACKFILL]
+            ],
+            ignore_conflicts=True,
+        )
+
+
+@transaction.atomic
+def unfollow(user, author):
+    if Follow.objects.filter(user=user, author=author).delete()[0]:
+        change_followers_count(author.pk, -1)
+        bump_versions(version_key('author-feed', author.pk))
+        TimelineEntry.objects.filter(user=user, post__author=author).delete()
+
+
+class TimelinePaginator(CursorPaginator):
+    """Лента подписок: материализованная лента плюс посты авторов,
+    которые не раздаются при записи."""
+
+    def __init__(self, user, per_page):
+        super().__init__(
+            TimelineEntry.objects.filter(user=user).select_related(
+                'post__author', 'post__group'
+            ),
+            per_page,
+            keys=('pub_date', 'post_id'),
+        )
+        read_time_authors = list(
+            Follow.objects.filter(
+                user=user,
+                author__post_counter__followers_count__gt=(
+                    settings.TIMELINE_FANOUT_LIMIT
+                ),
+            ).values_list('author_id', flat=True)
+        )
+        self.read_time_posts = read_time_authors and CursorPaginator(
+            Post.objects.filter(
+                author_id__in=read_time_authors
+            ).select_related('author', 'group'),
+            per_page,
+        )
+
+    def _cursor_for(self, post):
+        return encode_cursor([post.pub_date, post.pk])
+
+    def fetch(self, values=None, backwards=False):
+        posts = [entry.post for entry in super().fetch(values, backwards)]
+        if not self.read_time_posts:
+            return posts
+        merged = {
+            post.pk: post
+            for post in posts + self.read_time_posts.fetch(values, backwards)
+        }
+        return sorted(
+            merged.values(),
+            key=lambda post: (post.pub_date, post.pk),
+            reverse=not backwards,
+        )[:self.per_page + 1]
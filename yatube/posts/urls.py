@@ -1,13 +1,38 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
     path('group/<slug:slug>/', views.group_posts, name='slug'),
+    path('popular/', views.popular_posts, name='popular'),
+    path('tag/<str:name>/', views.tag_posts, name='tag'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path(
+        'profile/<str:username>/follow/',
+        views.profile_follow,
+        name='profile_follow'
+    ),
+    path(
+        'profile/<str:username>/unfollow/',
+        views.profile_unfollow,
+        name='profile_unfollow'
+    ),
+    path('follow/', views.follow_index, name='follow_index'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('search/', views.search, name='search'),
+    path('export/', views.export_posts, name='export'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<post_id>/edit/', views.post_edit, name='post_edit'),
+    path('api/v1/posts/', api.post_list, name='api_posts'),
+    path('api/v1/posts/since/', api.post_delta, name='api_post_delta'),
+    path('api/v1/posts/<int:post_id>/', api.post_item, name='api_post'),
+    path('api/v1/groups/', api.group_list, name='api_groups'),
+    path('api/v1/groups/<slug:slug>/', api.group_item, name='api_group'),
+    path(
+        'api/v1/profiles/<str:username>/',
+        api.profile_item,
+        name='api_profile'
+    ),
 ]
@@ -0,0 +1,156 @@
+import logging
+import threading
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+
+from .cache import bump_versions, version_key
+from .models import Post, PostViewCounter
+from .paginators import CursorPaginator, encode_cursor
+
+logger = logging.getLogger('yatube.view_counts')
+
+# Каждый пост — три параметра запроса; SQLite допускает до 999.
+WRITE_BATCH = 300
+
+
+def add_views(pks, counts):
+    """UPDATE ... CASE для счётчиков из pks; число обновлённых строк."""
+    return PostViewCounter.objects.filter(pk__in=pks).update(
+        views_count=F('views_count') + Case(
+            *(When(pk=pk, then=Value(counts[pk])) for pk in pks),
+            output_field=PositiveIntegerField(),
+        )
+    )
+
+
+def write_views(counts):
+    """Прибавляет просмотры {post_id: n} к счётчикам в базе.
+
+    Обычно это один UPDATE на WRITE_BATCH постов. Счётчики, которых
+    ещё нет, создаются нулевыми и обновляются тем же запросом; просмотры
+    удалённых постов отбрасываются.
+    """
+    pks = list(counts)
+    for start in range(0, len(pks), WRITE_BATCH):
+        batch = pks[start:start + WRITE_BATCH]
+        if add_views(batch, counts) == len(batch):
+            continue
+        missing = set(batch) - set(
+            PostViewCounter.objects.filter(
+                pk__in=batch
+            ).values_list('pk', flat=True)
+        )
+        PostViewCounter.objects.bulk_create(
+            [
+                PostViewCounter(post_id=pk)
+                for pk in Post.objects.filter(
+                    pk__in=missing
+                ).values_list('pk', flat=True)
+            ],
+            ignore_conflicts=True,
+        )
+        add_views(list(missing), counts)
+    bump_versions(version_key('popular'))
+
+
+class ViewBuffer:
+    """Просмотры постов, ещё не записанные в базу.
+
+    Запись происходит в запросе, который набрал VIEW_COUNTS_FLUSH_SIZE
+    просмотров, или по таймеру через VIEW_COUNTS_FLUSH_INTERVAL секунд
+    после первого незаписанного просмотра, даже если запросов больше
+    нет. При падении процесса теряется не больше этого.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timer = None
+        self.reset()
+
+    def reset(self):
+        self.counts = Counter()
+        self.pending = 0
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+    def schedule(self):
+        """Запускает таймер записи, если его ещё нет (под self.lock)."""
+        if self.timer is None:
+            self.timer = threading.Timer(
+                settings.VIEW_COUNTS_FLUSH_INTERVAL, self.flush_on_timer
+            )
+            self.timer.daemon = True
+            self.timer.start()
+
+    def add(self, post_id):
+        with self.lock:
+            self.counts[post_id] += 1
+            self.pending += 1
+            self.schedule()
+            due = self.pending >= settings.VIEW_COUNTS_FLUSH_SIZE
+        if due:
+            self.flush()
+
+    def flush_on_timer(self):
+        try:
+            self.flush()
+        finally:
+            # У потока таймера своё соединение с базой.
+            connections.close_all()
+
+    def flush(self):
+        with self.lock:
+            counts = self.counts
+            self.reset()
+        if not counts:
+            return
+        try:
+            write_views(counts)
+        except DatabaseError:
+            logger.exception('Не удалось записать просмотры постов')
+            with self.lock:
+                self.counts.update(counts)
+                self.pending += sum(counts.values())
+                self.schedule()
+
+
+buffer = ViewBuffer()
+
+
+def count_views(view):
+    """Считает успешные ответы view поста, включая ответы из кэша."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if request.method == 'GET' and response.status_code in (200, 304):
+            post_id = kwargs['post_id'] if 'post_id' in kwargs else args[0]
+            buffer.add(int(post_id))
+        return response
+    return wrapper
+
+
+class PopularPaginator(CursorPaginator):
+    """Самые просматриваемые посты по записанным счётчикам."""
+
+    def __init__(self, per_page):
+        super().__init__(
+            PostViewCounter.objects.filter(views_count__gt=0).select_related(
+                'post__author', 'post__group'
+            ),
+            per_page,
+            keys=('views_count', 'post_id'),
+        )
+
+    def _cursor_for(self, post):
+        return encode_cursor([post.view_counter.views_count, post.pk])
+
+    def fetch(self, values=None, backwards=False):
+        entries = super().fetch(values, backwards)
+        for entry in entries:
+            entry.post.view_counter = entry
+        return [entry.post for entry in entries]
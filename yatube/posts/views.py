@@ -1,20 +1,36 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.http import Http404, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.core.paginator import Paginator
 from django.shortcuts import render, get_object_or_404
 from django.shortcuts import redirect
 
-from .models import Post, Group, User
+from .models import AuthorCounter, Post, Group, Tag, User
 from .forms import PostForm
-
-from yatube.settings import PAGE_NUM
+from .cache import post_version_keys, version_key
+from .conditional import (
+    conditional_page, group_state, post_state, profile_state
+)
+from .export import CONTENT_TYPES, EXPORT_FORMATS, export_lines
+from .fragments import attach_cards
+from .objects import get_cached_object_or_404
+from .page_cache import cache_anonymous_page, cache_shared_page, depends_on
+from .paginators import paginate
+from .search import SearchPaginator
+from .tags import TagPaginator
+from .timeline import TimelinePaginator, follow, unfollow
+from .view_counts import PopularPaginator, count_views
 
 
+@cache_shared_page
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, PAGE_NUM)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    depends_on(request, [version_key('feed')])
+    post_list = Post.objects.select_related('author', 'group')
+    page_obj = paginate(request, post_list)
+    depends_on(
+        request, attach_cards(page_obj, 'posts/includes/index_post.html')
+    )
     template = 'posts/index.html'
     posts = Post.objects.all()
 
@@ -26,17 +42,23 @@ def index(request):
     return render(request, template, context)
 
 
+@conditional_page(group_state)
+@cache_shared_page
 def group_posts(request, slug):
 
     template = 'posts/group_list.html'
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    group = get_cached_object_or_404(Group, 'slug', slug)
+    depends_on(request, [
+        version_key('group', group.pk), version_key('group-feed', group.pk),
+    ])
+    posts = group.posts.select_related('author')
     description = group.description
     title = str(group)
 
-    paginator = Paginator(posts, PAGE_NUM)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, posts, count=group.posts_count)
+    depends_on(
+        request, attach_cards(page_obj, 'posts/includes/group_post.html')
+    )
 
     context = {
         'title': title,
@@ -48,17 +70,68 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@cache_shared_page
+def popular_posts(request):
+    depends_on(request, [version_key('popular')])
+    paginator = PopularPaginator(settings.PAGE_NUM)
+    page_obj = paginator.get_cursor_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    depends_on(
+        request, attach_cards(page_obj, 'posts/includes/index_post.html')
+    )
+    template = 'posts/popular.html'
+
+    context = {
+        'title': 'Популярные записи',
+        'page_obj': page_obj,
+    }
+    return render(request, template, context)
+
+
+@cache_shared_page
+def tag_posts(request, name):
+    tag = get_cached_object_or_404(Tag, 'name', name.lower())
+    depends_on(request, [version_key('tag-feed', tag.pk)])
+    paginator = TagPaginator(tag, settings.PAGE_NUM)
+    page_obj = paginator.get_cursor_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    depends_on(
+        request, attach_cards(page_obj, 'posts/includes/index_post.html')
+    )
+    template = 'posts/tag_list.html'
+
+    context = {
+        'title': str(tag),
+        'tag': tag,
+        'page_obj': page_obj,
+    }
+    return render(request, template, context)
+
+
+@conditional_page(profile_state)
+@cache_shared_page
 def profile(request, username):
 
     template = 'posts/profile.html'
-    username = get_object_or_404(User, username=username)
-    posts = username.posts.all()
+    username = get_cached_object_or_404(
+        User, 'username', username, related=('post_counter',)
+    )
+    depends_on(request, [
+        version_key('author', username.pk),
+        version_key('author-feed', username.pk),
+    ])
+    posts = username.posts.select_related('group')
     title = 'Профиль пользователя ' + str(username.get_full_name())
 
-    paginator = Paginator(posts, PAGE_NUM)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    posts_num = posts.count()
+    posts_num = AuthorCounter.posts_count_for(username)
+    page_obj = paginate(request, posts, count=posts_num)
+    depends_on(
+        request, attach_cards(page_obj, 'posts/includes/profile_post.html')
+    )
 
     context = {
 
@@ -70,16 +143,45 @@ def profile(request, username):
     return render(request, template, context)
 
 
+@count_views
+@conditional_page(post_state)
+@cache_anonymous_page
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    posts_num = post.author.posts.all().count()
+    post = get_cached_object_or_404(
+        Post, 'pk', post_id, related=('author__post_counter', 'group')
+    )
+    depends_on(request, [
+        *post_version_keys(post), version_key('author-feed', post.author_id),
+    ])
+    posts_num = AuthorCounter.posts_count_for(post.author)
     title = str(post)
     template = 'posts/post_detail.html'
 
     context = {
         'title': title,
         'post': post,
-        'post_num': posts_num,
+        'posts_num': posts_num,
+    }
+    return render(request, template, context)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    paginator = SearchPaginator(
+        Post.objects.select_related('author', 'group'),
+        query,
+        settings.PAGE_NUM,
+    )
+    page_obj = paginator.get_cursor_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    template = 'posts/search.html'
+
+    context = {
+        'title': 'Поиск',
+        'query': query,
+        'page_obj': page_obj,
     }
     return render(request, template, context)
 
@@ -122,3 +224,58 @@ def post_edit(request, post_id):
     }
     form = PostForm({'text': post.text, 'group': post.group})
     return render(request, 'posts/create_post.html', context)
+
+
+@login_required
+def follow_index(request):
+    paginator = TimelinePaginator(request.user, settings.PAGE_NUM)
+    page_obj = paginator.get_cursor_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    attach_cards(page_obj, 'posts/includes/index_post.html')
+    template = 'posts/follow.html'
+
+    context = {
+        'title': 'Подписки',
+        'page_obj': page_obj,
+    }
+    return render(request, template, context)
+
+
+@login_required
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        follow(request.user, author)
+    return redirect('posts:profile', username)
+
+
+@login_required
+def profile_unfollow(request, username):
+    author = get_object_or_404(User, username=username)
+    unfollow(request.user, author)
+    return redirect('posts:profile', username)
+
+
+@staff_member_required
+def export_posts(request):
+    posts = Post.objects.all()
+    if request.GET.get('author'):
+        posts = posts.filter(author=get_object_or_404(
+            User, username=request.GET['author']
+        ))
+    if request.GET.get('group'):
+        posts = posts.filter(group=get_object_or_404(
+            Group, slug=request.GET['group']
+        ))
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        raise Http404(f'Неизвестный формат {fmt}')
+
+    response = StreamingHttpResponse(
+        export_lines(posts, fmt, settings.EXPORT_CHUNK_SIZE),
+        content_type=CONTENT_TYPES[fmt],
+    )
+    response['Content-Disposition'] = f'attachment; filename="posts.{fmt}"'
+    return response
@@ -0,0 +1,16 @@
+from django.contrib.auth.backends import ModelBackend
+
+from posts.models import User
+from posts.objects import get_cached_object
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который берёт пользователя сессии из кэша объектов.
+
+    Кэш сбрасывается при сохранении пользователя (смена пароля,
+    last_login) и при выходе.
+    """
+
+    def get_user(self, user_id):
+        user = get_cached_object(User, 'pk', user_id)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.contrib.sessions.backends.cached_db import KEY_PREFIX
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import caches
+from django.db import migrations
+from django.utils import timezone
+
+OLD_BACKEND = 'django.contrib.auth.backends.ModelBackend'
+NEW_BACKEND = 'users.backends.CachedModelBackend'
+
+
+def use_cached_backend(apps, schema_editor):
+    """Переводит сессии ModelBackend на CachedModelBackend.
+
+    Иначе после замены AUTHENTICATION_BACKENDS эти пользователи
+    оказались бы разлогинены.
+    """
+    Session = apps.get_model('sessions', 'Session')
+    store = SessionStore()
+    cache = caches[settings.SESSION_CACHE_ALIAS]
+    for session in Session.objects.filter(
+        expire_date__gt=timezone.now()
+    ).iterator():
+        data = store.decode(session.session_data)
+        if data.get(BACKEND_SESSION_KEY) != OLD_BACKEND:
+            continue
+        data[BACKEND_SESSION_KEY] = NEW_BACKEND
+        session.session_data = store.encode(data)
+        session.save(update_fields=['session_data'])
+        cache.delete(KEY_PREFIX + session.session_key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sessions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(use_cached_backend, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,11 @@
+from django.contrib.auth.signals import user_logged_out
+from django.core.cache import cache
+from django.dispatch import receiver
+
+from posts.objects import instance_keys
+
+
+@receiver(user_logged_out)
+def forget_cached_user(sender, request, user, **kwargs):
+    if user is not None:
+        cache.delete_many(instance_keys(user))
@@ -0,0 +1,95 @@
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.contrib.auth.hashers import get_hasher
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post, User
+from posts.objects import object_key
+
+
+class CachedAuthTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth', password='pass')
+        cls.post = Post.objects.create(author=cls.user, text='Текст поста')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.login(username='auth', password='pass')
+
+    def test_pages_make_no_auth_queries(self):
+        """Сессия и пользователь берутся из кэша."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=[self.user.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        )
+        for url in urls:
+            self.authorized_client.get(url)
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.authorized_client.get(url)
+                self.assertEqual(response.context['user'], self.user)
+                for query in queries:
+                    self.assertNotIn('django_session', query['sql'])
+                    self.assertNotRegex(
+                        query['sql'],
+                        r'FROM "auth_user" WHERE "auth_user"."id"',
+                    )
+
+    def test_sessions_of_model_backend_are_migrated(self):
+        client = Client()
+        client.force_login(
+            self.user, backend='django.contrib.auth.backends.ModelBackend'
+        )
+        url = reverse('posts:follow_index')
+        self.assertEqual(client.get(url).status_code, 302)
+        import_module(
+            'users.migrations.0001_session_backend'
+        ).use_cached_backend(apps, None)
+        self.assertEqual(client.get(url).status_code, 200)
+        self.assertEqual(
+            client.session[BACKEND_SESSION_KEY],
+            'users.backends.CachedModelBackend',
+        )
+
+    def test_login_hashes_password_once(self):
+        """Неудачный вход не дороже удачного: один хэш пароля."""
+        hasher = type(get_hasher())
+        credentials = (
+            {'username': 'auth', 'password': 'pass'},
+            {'username': 'auth', 'password': 'wrong'},
+            {'username': 'nobody', 'password': 'pass'},
+        )
+        for data in credentials:
+            with self.subTest(**data):
+                with mock.patch.object(
+                    hasher, 'encode', autospec=True,
+                    side_effect=hasher.encode,
+                ) as encode:
+                    Client().post(reverse('users:login'), data)
+                self.assertEqual(encode.call_count, 1)
+
+    def test_password_change_ends_session(self):
+        url = reverse('posts:follow_index')
+        self.assertEqual(self.authorized_client.get(url).status_code, 200)
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password('new-pass')
+        user.save()
+        self.assertEqual(self.authorized_client.get(url).status_code, 302)
+
+    def test_logout_forgets_cached_user(self):
+        self.authorized_client.get(reverse('posts:index'))
+        self.assertIsNotNone(cache.get(object_key(User, self.user.pk)))
+        self.authorized_client.get(reverse('users:logout'))
+        self.assertIsNone(cache.get(object_key(User, self.user.pk)))
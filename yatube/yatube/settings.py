@@ -44,10 +44,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.sql.SQLInstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.profiling.ProfilingMiddleware',
+    'core.middleware.ratelimit.RateLimitMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -87,6 +90,55 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+
+# LocMemCache живёт в памяти одного процесса: сброс версий в одном
+# воркере не виден другим, и они отдают устаревшие страницы и объекты
+# до PAGE_CACHE_TIMEOUT и OBJECT_CACHE_TIMEOUT. В продакшене с несколькими
+# воркерами нужен общий кэш, например
+# CACHE_BACKEND=django.core.cache.backends.memcached.MemcachedCache
+# и CACHE_LOCATION=127.0.0.1:11211 (нужен пакет python-memcached).
+LOCMEM_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', LOCMEM_CACHE)
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+        # Страница ленты — это сама страница, 10 карточек и около
+        # 20 ключей версий; 300 записей по умолчанию хватает на 10 страниц.
+        'OPTIONS': (
+            {'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 50000))}
+            if CACHE_BACKEND == LOCMEM_CACHE else {}
+        ),
+    },
+    # Счётчики ограничения частоты запросов: отдельно от default, чтобы
+    # их не вытесняли страницы. Бэкенду нужен атомарный incr, который
+    # сохраняет срок жизни ключа: в продакшене это общий для всех
+    # процессов memcached (RATELIMIT_CACHE_LOCATION=127.0.0.1:11211),
+    # без него — LocMemCache, у которого лимиты свои в каждом процессе.
+    'ratelimit': (
+        {
+            'BACKEND': (
+                'django.core.cache.backends.memcached.MemcachedCache'
+            ),
+            'LOCATION': os.environ['RATELIMIT_CACHE_LOCATION'],
+        }
+        if 'RATELIMIT_CACHE_LOCATION' in os.environ
+        else {'BACKEND': LOCMEM_CACHE, 'LOCATION': 'ratelimit'}
+    ),
+}
+
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# Сессии, созданные до CachedModelBackend, переводит на него миграция
+# users.0001_session_backend. Второй бэкенд здесь не нужен: на неудачном
+# входе authenticate() вызывался бы в обоих и хэшировал пароль дважды.
+AUTHENTICATION_BACKENDS = ['users.backends.CachedModelBackend']
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -131,3 +183,50 @@ LOGIN_REDIRECT_URL = 'posts:index'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 PAGE_NUM = 10
+PAGINATOR_COUNT_TIMEOUT = 60
+ESTIMATED_COUNT_MIN = 100000
+PAGE_CACHE_TIMEOUT = 60 * 10
+PAGE_CACHE_SHARED = True
+OBJECT_CACHE_TIMEOUT = 60 * 60
+OBJECT_CACHE_MISSING_TIMEOUT = 30
+OBJECT_CACHE_LOCK_TIMEOUT = 5
+TIMELINE_FANOUT_CHUNK = 1000
+TIMELINE_FANOUT_LIMIT = 10000
+TIMELINE_BACKFILL = 100
+EXPORT_CHUNK_SIZE = 1000
+DELTA_MAX_WAIT = 25
+DELTA_POLL_INTERVAL = 0.5
+DELTA_MARK_TIMEOUT = 5
+DELTA_MAX_COUNT = 100
+VIEW_COUNTS_FLUSH_INTERVAL = 10
+VIEW_COUNTS_FLUSH_SIZE = 200
+RATELIMIT_CACHE = 'ratelimit'
+# Сколько доверенных прокси перед приложением дописывают X-Forwarded-For.
+RATELIMIT_PROXY_COUNT = int(os.environ.get('RATELIMIT_PROXY_COUNT', 0))
+# Лимиты небезопасных запросов: (scope, число запросов, окно в секундах).
+RATE_LIMITS = {
+    'posts:post_create': [('user', 10, 60), ('ip', 30, 60)],
+    'posts:post_edit': [('user', 30, 60), ('ip', 60, 60)],
+    'users:login': [('ip', 10, 60)],
+    'users:signup': [('ip', 5, 600)],
+}
+SQL_INSTRUMENTATION = True
+PROFILING_DIR = os.environ.get('PROFILING_DIR')
+PROFILING_SAMPLE_INTERVAL = 0.005
+SQL_SLOW_QUERY_MS = 100
+SQL_TOP_QUERIES = 3
+SQL_MAX_EXPLAINS = 1
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'yatube.sql': {
+            'handlers': ['console'],
+            'level': os.environ.get('SQL_LOG_LEVEL', 'WARNING'),
+        },
+    },
+}